@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+from urllib.parse import parse_qs
+
+from main10 import MMAP_TABLES, REVIEWER_ROLES, ApprovalError, ClaimConflictError, DataManager, RequestManager, RequestNotFoundError, UserManager, VersionConflictError
+
+REVIEW_ACTIONS = {'approve': 'Approved', 'deny': 'Denied', 'return': 'Returned'}
+MAX_PAGE_SIZE = 500
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class ApprovalAPI:
+    ROUTES = [
+        ('GET', r'/requests', 'list_requests'),
+        ('POST', r'/requests', 'create_request'),
+        ('GET', r'/requests/(?P<request_id>[^/]+)', 'get_request'),
+        ('GET', r'/requests/(?P<request_id>[^/]+)/history', 'request_history'),
+        ('POST', r'/requests/(?P<request_id>[^/]+)/(?P<action>approve|deny|return)', 'review_request'),
+        ('POST', r'/requests/(?P<request_id>[^/]+)/claim', 'claim_request'),
+        ('POST', r'/requests/(?P<request_id>[^/]+)/release', 'release_claim'),
+    ]
+
+    def __init__(self, data_manager=None):
+        self.data_manager = data_manager or DataManager(mmap_tables=MMAP_TABLES)
+        self.request_manager = RequestManager(self.data_manager)
+        self.user_manager = UserManager(self.data_manager)
+        self.routes = [(method, re.compile(pattern + '$'), getattr(self, name)) for method, pattern, name in self.ROUTES]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        status, payload = await asyncio.to_thread(self.dispatch, scope['method'], scope['path'], scope['query_string'], body)
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())]})
+        await send({'type': 'http.response.body', 'body': payload})
+
+    def dispatch(self, method, path, query_string, body):
+        try:
+            for route_method, pattern, handler in self.routes:
+                match = pattern.match(path)
+                if match and route_method == method:
+                    params = {key: values[-1] for key, values in parse_qs(query_string.decode()).items()}
+                    data = json.loads(body) if body else {}
+                    if not isinstance(data, dict):
+                        raise HTTPError(400, "Request body must be a JSON object.")
+                    status, result = handler(params, data, **match.groupdict())
+                    return status, result if isinstance(result, bytes) else json.dumps(result).encode()
+            raise HTTPError(404, f"No route for {method} {path}")
+        except HTTPError as error:
+            return error.status, json.dumps({'error': str(error)}).encode()
+        except RequestNotFoundError as error:
+            return 404, json.dumps({'error': str(error)}).encode()
+        except (VersionConflictError, ClaimConflictError) as error:
+            return 409, json.dumps({'error': str(error)}).encode()
+        except (ApprovalError, ValueError) as error:
+            return 400, json.dumps({'error': str(error)}).encode()
+
+    def _required(self, data, *fields):
+        missing = [field for field in fields if not data.get(field)]
+        if missing:
+            raise HTTPError(400, f"Missing field(s): {', '.join(missing)}")
+        return [data[field] for field in fields]
+
+    def _role(self, username):
+        try:
+            return self.user_manager.login(username)
+        except ApprovalError as error:
+            raise HTTPError(403, str(error)) from error
+
+    def _records(self, df):
+        return df.to_json(orient='records', date_format='iso').encode()
+
+    def list_requests(self, params, data):
+        predicates = {key: params[key] for key in ('status', 'user', 'type', 'assignee') if key in params}
+        limit = min(int(params.get('limit', 50)), MAX_PAGE_SIZE)
+        query = self.request_manager.get_review_queue(params['queue']) if 'queue' in params else self.request_manager.requests
+        if params.get('order_by') == 'priority':
+            page_df, next_after = query.where(**predicates).top(limit), None
+        else:
+            page_df = query.where(**predicates).page(params.get('after'), limit, params.get('order_by', 'id'))
+            next_after = page_df['id'].iloc[-1] if len(page_df) == limit else None
+        return 200, b'{"items":' + self._records(page_df) + b',"next_after":' + json.dumps(next_after).encode() + b'}'
+
+    def create_request(self, params, data):
+        user, request_type, title = self._required(data, 'user', 'request_type', 'title')
+        self._role(user)
+        new_id = self.request_manager.create_request(user, request_type, title, data.get('description', ''), data.get('priority'))
+        return 201, {'id': new_id}
+
+    def get_request(self, params, data, request_id):
+        return 200, self.request_manager.get_request_by_id(request_id).to_json(date_format='iso').encode()
+
+    def request_history(self, params, data, request_id):
+        return 200, self._records(self.request_manager.get_request_history(request_id))
+
+    def _reviewer(self, data):
+        user, = self._required(data, 'user')
+        if self._role(user) not in REVIEWER_ROLES:
+            raise HTTPError(403, f"User '{user}' cannot review requests.")
+        return user
+
+    def review_request(self, params, data, request_id, action):
+        user = self._reviewer(data)
+        if not isinstance(data.get('version'), int) or isinstance(data['version'], bool):
+            raise HTTPError(400, "Review requests need the integer 'version' of the request being reviewed.")
+        request = self.request_manager.update_request_status(request_id, REVIEW_ACTIONS[action], user, data.get('comment'), data['version'])
+        return 200, {'id': request_id, 'status': request['status'], 'version': request['version']}
+
+    def claim_request(self, params, data, request_id):
+        user = self._reviewer(data)
+        expires_at = self.request_manager.claim_request(request_id, user, data.get('minutes'))
+        return 200, {'id': request_id, 'user': user, 'expires_at': expires_at.isoformat()}
+
+    def release_claim(self, params, data, request_id):
+        user = self._reviewer(data)
+        return 200, {'id': request_id, 'released': self.request_manager.release_claim(request_id, user)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the approval requests as a local JSON HTTP API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--keep-alive', type=int, default=30, help="Seconds to keep idle client connections open.")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError as error:
+        raise ImportError("The HTTP API requires uvicorn. Install it with 'pip install uvicorn'.") from error
+    os.chdir(args.data_dir)
+    uvicorn.run(ApprovalAPI(), host=args.host, port=args.port, timeout_keep_alive=args.keep_alive, log_level='warning')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from main10 import MMAP_TABLES, USER_ROLES, ApprovalError, DataManager, RequestManager, UserManager
+
+class Progress:
+    def __init__(self, label, total, stream=sys.stderr):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.stream = stream
+        self.start = time.perf_counter()
+
+    def advance(self, count):
+        self.done += count
+        elapsed = time.perf_counter() - self.start
+        rate = self.done / elapsed if elapsed else 0
+        percent = self.done / self.total * 100 if self.total else 100
+        self.stream.write(f"\r{self.label}: {self.done}/{self.total} ({percent:5.1f}%) {rate:,.0f}/s")
+        self.stream.flush()
+
+    def finish(self):
+        self.stream.write(f"\r{self.label}: {self.done}/{self.total} done in {time.perf_counter() - self.start:.2f}s\n")
+        self.stream.flush()
+
+def read_usernames(args, user_manager):
+    if args.users:
+        return [username.strip() for username in args.users.split(',') if username.strip()]
+    if args.users_file:
+        with open(args.users_file) as users_file:
+            return [line.strip() for line in users_file if line.strip()]
+    users_df = user_manager.get_all_users()
+    return users_df.loc[users_df['role'] == args.from_role, 'username'].tolist()
+
+def set_role(args, data_manager):
+    user_manager = UserManager(data_manager)
+    usernames = read_usernames(args, user_manager)
+    progress = Progress(f"Setting role '{args.role}'", len(usernames))
+    changed = user_manager.change_user_roles(usernames, args.role, args.chunk_size, progress.advance)
+    progress.finish()
+    print(f"Changed the role of {changed} user(s) to '{args.role}'.")
+
+def compact(args, data_manager):
+    start = time.perf_counter()
+    archived = RequestManager(data_manager).compact_deleted_requests()
+    print(f"Moved {archived} deleted request(s) to the archive in {time.perf_counter() - start:.2f}s.")
+
+def purge_deleted(args, data_manager):
+    request_manager = RequestManager(data_manager)
+    if args.compact:
+        compact(args, data_manager)
+    start = time.perf_counter()
+    purged = request_manager.purge_deleted_requests(args.before)
+    print(f"Purged {purged} archived request(s) deleted before {args.before} in {time.perf_counter() - start:.2f}s.")
+
+def reindex(args, data_manager):
+    start = time.perf_counter()
+    indexes = RequestManager(data_manager).rebuild_indexes()
+    print(f"Rebuilt {', '.join(indexes)} indexes over {len(indexes['id'].ids)} request(s) in {time.perf_counter() - start:.2f}s.")
+
+def recompute_id_counters(args, data_manager):
+    start = time.perf_counter()
+    counters = RequestManager(data_manager).rebuild_counters()
+    print(f"Recomputed counters for {len(counters.ids)} ID prefix(es) in {time.perf_counter() - start:.2f}s.")
+    for prefix, increment in sorted(counters.ids.items()):
+        print(f"  {prefix}: {increment}")
+
+def auto_approve(args, data_manager):
+    start = time.perf_counter()
+    applied = RequestManager(data_manager).apply_auto_rules(dry_run=args.dry_run)
+    verb = "Would apply" if args.dry_run else "Applied"
+    print(f"{verb} auto-approval rules to {sum(applied.values())} pending request(s) in {time.perf_counter() - start:.2f}s.")
+    for name, count in sorted(applied.items()):
+        print(f"  {name}: {count}")
+
+def import_requests(args, data_manager):
+    start = time.perf_counter()
+    requests_df = pd.read_csv(args.file, dtype={'user': str, 'request_type': str, 'title': str, 'description': str})
+    imported = RequestManager(data_manager).import_requests(requests_df)
+    print(f"Imported {len(imported)} request(s) in {time.perf_counter() - start:.2f}s.")
+    for status, count in imported['status'].value_counts().items():
+        if count:
+            print(f"  {status}: {count}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m approval', description="Maintenance commands for the approval system.")
+    parser.add_argument('--data-dir', default='.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    admin = commands.add_parser('admin', help="Bulk administration over the data directory.").add_subparsers(dest='operation', required=True)
+
+    set_role_parser = admin.add_parser('set-role', help="Change the role of many users at once.")
+    set_role_parser.add_argument('--role', required=True, choices=USER_ROLES)
+    targets = set_role_parser.add_mutually_exclusive_group(required=True)
+    targets.add_argument('--users', help="Comma-separated usernames.")
+    targets.add_argument('--users-file', help="File with one username per line.")
+    targets.add_argument('--from-role', choices=USER_ROLES, help="Every user that currently has this role.")
+    set_role_parser.add_argument('--chunk-size', type=int, default=100_000, help="Usernames matched per step.")
+    set_role_parser.set_defaults(handler=set_role)
+
+    admin.add_parser('compact', help="Move soft-deleted requests into the deleted requests archive.").set_defaults(handler=compact)
+
+    purge_parser = admin.add_parser('purge-deleted', help="Drop archived deleted requests older than a date.")
+    purge_parser.add_argument('--before', required=True, help="ISO date or timestamp; older deletions are purged.")
+    purge_parser.add_argument('--compact', action='store_true', help="Archive soft-deleted requests first.")
+    purge_parser.set_defaults(handler=purge_deleted)
+
+    admin.add_parser('reindex', help="Rebuild the search, ID and filter indexes in every running process.").set_defaults(handler=reindex)
+    admin.add_parser('recompute-id-counters', help="Recompute request counters and ID counters from the data.").set_defaults(handler=recompute_id_counters)
+
+    auto_approve_parser = admin.add_parser('auto-approve', help="Run the auto-approval rules over the pending backlog.")
+    auto_approve_parser.add_argument('--dry-run', action='store_true', help="Only report how many requests each rule would change.")
+    auto_approve_parser.set_defaults(handler=auto_approve)
+
+    import_parser = admin.add_parser('import-requests', help="Create requests in bulk from a CSV file, applying the auto-approval rules.")
+    import_parser.add_argument('file', help="CSV with user, request_type, title and optional description and priority columns.")
+    import_parser.set_defaults(handler=import_requests)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    os.chdir(args.data_dir)
+    try:
+        args.handler(args, DataManager(mmap_tables=MMAP_TABLES))
+    except (ApprovalError, ValueError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
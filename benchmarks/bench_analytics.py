@@ -0,0 +1,74 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from main10 import ApprovalAnalytics, DataManager, RequestManager
+
+def synthetic_history(event_count, approvers=20):
+    rows = []
+    start = pd.Timestamp('2024-01-01').value
+    request_number = 0
+    while len(rows) < event_count:
+        request_id = f"{'ABCDEF'[request_number % 6]}{request_number}"
+        timestamp = start + request_number * 60_000_000_000
+        rows.append((request_id, timestamp, 'Created', f"user{request_number % 500}"))
+        while len(rows) < event_count:
+            timestamp += random.randrange(60, 72 * 3600) * 1_000_000_000
+            action = random.choice(['Approved', 'Denied', 'Returned', 'Returned'])
+            rows.append((request_id, timestamp, action, f"approver{random.randrange(approvers)}"))
+            if action != 'Returned':
+                break
+            timestamp += random.randrange(60, 24 * 3600) * 1_000_000_000
+            rows.append((request_id, timestamp, 'Pending', f"user{request_number % 500}"))
+        request_number += 1
+    history_df = pd.DataFrame(rows, columns=['request_id', 'timestamp', 'action', 'user'])
+    history_df['timestamp'] = pd.to_datetime(history_df['timestamp'])
+    history_df['details'] = '{}'
+    return history_df
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the approval analytics over a synthetic request history.")
+    parser.add_argument('--events', type=int, default=1_000_000)
+    parser.add_argument('--appended', type=int, default=1_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.chdir(data_dir)
+        data_manager = DataManager()
+        request_manager = RequestManager(data_manager)
+        synthetic_history(args.events).to_csv(data_manager.request_history_file, index=False)
+
+        start = time.perf_counter()
+        history_df = data_manager.load_request_history()
+        loaded = time.perf_counter()
+        analytics = request_manager.get_analytics()
+        built = time.perf_counter()
+        summary = analytics.summary()
+        summarized = time.perf_counter()
+        print(f"parse {len(history_df)} events  {(loaded - start) * 1000:9.1f} ms")
+        print(f"full aggregate          {(built - loaded) * 1000:9.1f} ms")
+        print(f"summary                 {(summarized - built) * 1000:9.1f} ms")
+
+        open_ids = list(analytics.open_since) or ['A0']
+        with data_manager.transaction() as uow:
+            for i in range(args.appended):
+                uow.log(random.choice(open_ids), random.choice(['Approved', 'Denied']), f"approver{i % 20}")
+        start = time.perf_counter()
+        request_manager.get_analytics()
+        refreshed = time.perf_counter()
+        print(f"refresh +{args.appended} events     {(refreshed - start) * 1000:9.1f} ms")
+
+        full = ApprovalAnalytics().refresh(data_manager.load_request_history())
+        assert full.approver_turnaround().equals(analytics.approver_turnaround())
+        print(f"\n{summary['decisions']} decisions, median wait {summary['median_wait_hours']:.1f} h, "
+              f"{summary['within_sla']:.0%} within {ApprovalAnalytics.SLA_HOURS} h, {summary['returned_requests']} requests returned")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import pandas as pd
+
+from main10 import DataManager, RequestManager
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+def seed(data_dir, request_count):
+    os.chdir(data_dir)
+    data_manager = DataManager()
+    data_manager.save_users(pd.DataFrame([{'username': 'bench', 'role': 'admin', 'approved': True}]))
+    request_manager = RequestManager(data_manager)
+    imported = request_manager.import_requests(pd.DataFrame({
+        'user': 'bench',
+        'request_type': [random.choice('ABCDEF') for _ in range(request_count)],
+        'title': [f"Seeded {i}" for i in range(request_count)],
+        'description': "Created by bench_api",
+    }))
+    return imported['id'].tolist()
+
+def wait_for_server(port, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"API server did not start on port {port}")
+
+def endpoints(request_ids):
+    review_ids = iter(request_ids)
+    return {
+        'GET /requests': lambda: ('GET', '/requests?limit=50', None),
+        'GET /requests?status': lambda: ('GET', '/requests?status=Pending&limit=50', None),
+        'GET /requests/{id}': lambda: ('GET', f"/requests/{random.choice(request_ids)}", None),
+        'GET /requests/{id}/history': lambda: ('GET', f"/requests/{random.choice(request_ids)}/history", None),
+        'POST /requests': lambda: ('POST', '/requests', {'user': 'bench', 'request_type': random.choice('ABCDEF'), 'title': "Load test", 'description': "Created by bench_api"}),
+        'POST /requests/{id}/return': lambda: ('POST', f"/requests/{next(review_ids, request_ids[0])}/return", {'user': 'bench', 'comment': "Load test", 'version': 1}),
+    }
+
+def client(port, make_request, deadline, latencies, errors):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    while time.perf_counter() < deadline:
+        method, path, payload = make_request()
+        body = json.dumps(payload) if payload is not None else None
+        start = time.perf_counter()
+        connection.request(method, path, body=body, headers={'Content-Type': 'application/json'} if body else {})
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status >= 400:
+            errors.append(response.status)
+    connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure requests/sec per endpoint of the JSON HTTP API over keep-alive connections.")
+    parser.add_argument('--requests', type=int, default=2000, help="Number of requests to seed.")
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds to load each endpoint.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        request_ids = seed(data_dir, args.requests)
+        port = free_port()
+        server = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, 'api.py'), '--port', str(port), '--data-dir', data_dir])
+        try:
+            wait_for_server(port)
+            print(f"{'endpoint':<30} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+            for name, make_request in endpoints(request_ids).items():
+                latencies, errors = [], []
+                deadline = time.perf_counter() + args.duration
+                threads = [threading.Thread(target=client, args=(port, make_request, deadline, latencies, errors)) for _ in range(args.clients)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                latencies.sort()
+                print(f"{name:<30} {len(latencies) / args.duration:9.1f} {latencies[len(latencies) // 2] * 1000:8.2f} "
+                      f"{latencies[int(len(latencies) * 0.99)] * 1000:8.2f} {len(errors):7d}")
+        finally:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main10 import ASSIGNMENT_STRATEGIES, REQUEST_TYPES, TypePoolAssignment
+
+def synthetic_load(request_count, approvers, utilization, mean_service, seed):
+    rng = random.Random(seed)
+    speeds = {approver: rng.uniform(0.5, 2.0) for approver in approvers}
+    capacity = sum(speeds.values()) / mean_service
+    arrivals = []
+    now = 0.0
+    for _ in range(request_count):
+        now += rng.expovariate(capacity * utilization)
+        arrivals.append((now, rng.choice(REQUEST_TYPES), rng.expovariate(1 / mean_service)))
+    return speeds, arrivals
+
+def type_pools(approvers, pool_size):
+    return {request_type: [approvers[(offset * pool_size + i) % len(approvers)] for i in range(pool_size)] for offset, request_type in enumerate(REQUEST_TYPES)}
+
+def simulate(strategy, approvers, speeds, arrivals):
+    finishes = {approver: [] for approver in approvers}
+    free_at = dict.fromkeys(approvers, 0.0)
+    waits = []
+    peak_load = 0
+    for assigned, (arrived, request_type, work) in enumerate(arrivals):
+        for approver in approvers:
+            open_items = finishes[approver]
+            while open_items and open_items[0] <= arrived:
+                heapq.heappop(open_items)
+        loads = {approver: len(finishes[approver]) for approver in approvers}
+        approver = strategy.choose(request_type, approvers, loads, assigned)
+        start = max(arrived, free_at[approver])
+        free_at[approver] = start + work / speeds[approver]
+        heapq.heappush(finishes[approver], free_at[approver])
+        waits.append(start - arrived)
+        peak_load = max(peak_load, len(finishes[approver]))
+    return sorted(waits), peak_load
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate queue wait times of the request assignment strategies under synthetic load.")
+    parser.add_argument('--requests', type=int, default=100_000)
+    parser.add_argument('--approvers', type=int, default=12)
+    parser.add_argument('--utilization', type=float, default=0.85, help="Arrival rate as a fraction of total approver capacity.")
+    parser.add_argument('--mean-service', type=float, default=30.0, help="Mean minutes an average approver spends per request.")
+    parser.add_argument('--pool-size', type=int, default=4, help="Approvers per request type for the type-pools strategy.")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    approvers = [f"approver{i:02d}" for i in range(args.approvers)]
+    speeds, arrivals = synthetic_load(args.requests, approvers, args.utilization, args.mean_service, args.seed)
+    strategies = {name: strategy() for name, strategy in ASSIGNMENT_STRATEGIES.items()}
+    strategies['type-pools'] = TypePoolAssignment(type_pools(approvers, args.pool_size))
+
+    print(f"{args.requests} requests, {args.approvers} approvers, {args.utilization:.0%} utilization, waits in minutes")
+    print(f"{'strategy':<14} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'peak load':>10} {'assign/s':>10}")
+    for name, strategy in strategies.items():
+        start = time.perf_counter()
+        waits, peak_load = simulate(strategy, approvers, speeds, arrivals)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<14} {sum(waits) / len(waits):9.1f} {waits[len(waits) // 2]:9.1f} {waits[int(len(waits) * 0.95)]:9.1f} "
+              f"{waits[int(len(waits) * 0.99)]:9.1f} {peak_load:10d} {len(arrivals) / elapsed:10,.0f}")
+
+if __name__ == "__main__":
+    main()
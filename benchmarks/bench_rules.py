@@ -0,0 +1,87 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from main10 import REQUEST_TYPES, AutoApprovalRules, DataManager, RequestManager
+
+RULES = [
+    {'name': 'routine-supplies', 'types': ['A', 'B'], 'keywords': ['toner', 'paper', 'license renewal'], 'exclude_keywords': ['urgent', 'exception']},
+    {'name': 'trusted-requesters', 'types': ['A'], 'roles': ['user'], 'min_approval_rate': 0.9, 'min_decisions': 5},
+    {'name': 'hardware-to-it', 'action': 'route', 'keywords': ['server', 'laptop'], 'assignee': 'approver0', 'priority': 5},
+]
+WORDS = ['toner', 'paper', 'license renewal', 'server', 'laptop', 'travel', 'conference', 'urgent', 'desk', 'monitor', 'exception', 'software']
+
+def synthetic_requests(request_count, user_count, seed):
+    rng = random.Random(seed)
+    users = [f"user{rng.randrange(user_count)}" for _ in range(request_count)]
+    return pd.DataFrame({
+        'id': [f"R{i}" for i in range(request_count)],
+        'user': users,
+        'request_type': pd.Categorical([rng.choice(REQUEST_TYPES) for _ in range(request_count)], categories=REQUEST_TYPES),
+        'title': [f"{rng.choice(WORDS)} request" for _ in range(request_count)],
+        'description': [' '.join(rng.sample(WORDS, 3)) for _ in range(request_count)],
+        'status': pd.Categorical(['Pending'] * request_count, categories=['Pending', 'Approved', 'Denied', 'Returned']),
+        'created_at': pd.Timestamp('2024-01-01'),
+        'version': pd.array([1] * request_count, dtype='Int64'),
+    })
+
+def synthetic_users(user_count, seed):
+    rng = random.Random(seed)
+    return pd.DataFrame({
+        'username': [f"user{i}" for i in range(user_count)] + [f"approver{i}" for i in range(5)],
+        'role': ['user'] * user_count + ['approver'] * 5,
+        'approved': True,
+    }), pd.Series([rng.random() for _ in range(user_count)], index=[f"user{i}" for i in range(user_count)])
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure auto-approval rule throughput over batches of requests.")
+    parser.add_argument('--requests', type=int, default=500_000)
+    parser.add_argument('--users', type=int, default=5_000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    requests_df = synthetic_requests(args.requests, args.users, args.seed)
+    users_df, approval_rates = synthetic_users(args.users, args.seed)
+    rules = AutoApprovalRules(RULES)
+
+    roles = requests_df['user'].map(users_df.set_index('username')['role'])
+    rates = requests_df['user'].map(approval_rates)
+    decisions = pd.Series(10, index=requests_df.index)
+    start = time.perf_counter()
+    matched = rules.evaluate(requests_df, roles, rates, decisions)
+    elapsed = time.perf_counter() - start
+    print(f"evaluate {len(requests_df)} requests    {elapsed * 1000:9.1f} ms  {len(requests_df) / elapsed:12,.0f} requests/s")
+    for position, count in matched.value_counts().sort_index().items():
+        print(f"  {RULES[position]['name'] if position >= 0 else 'no match':<20} {count:9d}")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        os.chdir(data_dir)
+        data_manager = DataManager()
+        data_manager.save_users(users_df)
+        requests_df.to_csv(data_manager.requests_file, index=False)
+        request_manager = RequestManager(data_manager, auto_rules=rules)
+        request_manager.get_counters()
+        start = time.perf_counter()
+        applied = request_manager.apply_auto_rules()
+        elapsed = time.perf_counter() - start
+        print(f"apply to backlog            {elapsed * 1000:9.1f} ms  {len(requests_df) / elapsed:12,.0f} requests/s")
+        for name, count in sorted(applied.items()):
+            print(f"  {name:<20} {count:9d}")
+
+        start = time.perf_counter()
+        imported = request_manager.import_requests(requests_df[['user', 'request_type', 'title', 'description']])
+        elapsed = time.perf_counter() - start
+        print(f"import as new requests      {elapsed * 1000:9.1f} ms  {len(imported) / elapsed:12,.0f} requests/s")
+        for status, count in imported['status'].value_counts().items():
+            if count:
+                print(f"  {status:<20} {count:9d}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_DIR, 'main10.py')
+
+COLD_START_SCRIPT = """
+import sys, time
+sys.path.insert(0, {repo_dir!r})
+start = time.perf_counter()
+import main10
+imported = time.perf_counter()
+app = main10.ApprovalApp()
+constructed = time.perf_counter()
+app.data_manager.load_users()
+loaded = time.perf_counter()
+print(imported - start, constructed - imported, loaded - constructed)
+"""
+
+def cold_start(data_dir):
+    script = COLD_START_SCRIPT.format(repo_dir=REPO_DIR)
+    output = subprocess.run([sys.executable, '-c', script], cwd=data_dir, capture_output=True, text=True, check=True).stdout
+    return [float(value) for value in output.split()[-3:]]
+
+def import_profile(data_dir, top):
+    script = f"import sys; sys.path.insert(0, {REPO_DIR!r}); import main10"
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], cwd=data_dir, capture_output=True, text=True, check=True).stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        entries.append((int(cumulative_us), name.rstrip()))
+    return sorted(entries, reverse=True)[:top]
+
+def rerun_times(data_dir, reruns):
+    from streamlit.testing.v1 import AppTest
+    os.chdir(data_dir)
+    app_test = AppTest.from_file(APP_PATH, default_timeout=60)
+    app_test.session_state['logged_in_user'] = 'bench'
+    app_test.session_state['user_role'] = 'admin'
+    start = time.perf_counter()
+    app_test.run()
+    first = time.perf_counter() - start
+    timings = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app_test.run()
+        timings.append(time.perf_counter() - start)
+    return first, sum(timings) / len(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time, cold start and rerun cost of main10.py.")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--reruns', type=int, default=20)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        phases = [cold_start(data_dir) for _ in range(args.runs)]
+        for label, values in zip(['import main10', 'ApprovalApp()', 'first table load'], zip(*phases)):
+            print(f"{label:<18} best={min(values) * 1000:8.1f} ms  mean={sum(values) / len(values) * 1000:8.1f} ms")
+
+        print("\nSlowest imports (cumulative) for 'import main10':")
+        for cumulative_us, name in import_profile(data_dir, args.top):
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+        first, warm = rerun_times(data_dir, args.reruns)
+        print(f"\nfirst script run   {first * 1000:8.1f} ms")
+        print(f"warm rerun (mean)  {warm * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from main10 import DataManager, RequestManager
+
+def seed(data_dir, request_count):
+    rows = [{'id': f"{'ABCDEF'[i % 6]}1{i}", 'user': f"user{i % 50}", 'request_type': 'ABCDEF'[i % 6],
+             'title': f"Request {i}", 'description': f"Synthetic request number {i}",
+             'status': random.choice(['Pending', 'Approved', 'Denied', 'Returned']), 'approver_comment': None}
+            for i in range(request_count)]
+    os.chdir(data_dir)
+    DataManager().save_requests(pd.DataFrame(rows))
+
+def worker(data_dir, duration, write_ratio, results):
+    os.chdir(data_dir)
+    request_manager = RequestManager(DataManager())
+    operations = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        if random.random() < write_ratio:
+            request_manager.create_request(f"user{random.randrange(50)}", random.choice('ABCDEF'), "Load test", "Created by bench_workers")
+        else:
+            request_manager.get_user_requests(f"user{random.randrange(50)}")
+            request_manager.get_pending_requests()
+            request_manager.get_approved_requests()
+            request_manager.get_denied_requests()
+            request_manager.get_returned_requests()
+        operations += 1
+    results.put(operations)
+
+def run(worker_count, data_dir, duration, write_ratio):
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(data_dir, duration, write_ratio, results)) for _ in range(worker_count)]
+    for process in processes:
+        process.start()
+    total = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return total / duration
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure page-load throughput against worker count on a shared data directory.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--write-ratio', type=float, default=0.02)
+    args = parser.parse_args()
+
+    baseline = None
+    for worker_count in args.workers:
+        with tempfile.TemporaryDirectory() as data_dir:
+            seed(data_dir, args.requests)
+            throughput = run(worker_count, data_dir, args.duration, args.write_ratio)
+        baseline = baseline or throughput / worker_count
+        print(f"workers={worker_count:<3} ops/s={throughput:10.1f} scaling={throughput / baseline:5.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,225 +1,2096 @@
 import streamlit as st
-import pandas as pd
 import os
+import importlib
+import io
+import re
+import csv
+import json
+import math
+import heapq
+import bisect
+import operator
+import threading
+from collections import Counter, defaultdict
 from datetime import datetime
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+MMAP_TABLES = tuple(table for table in os.environ.get('APPROVAL_MMAP_TABLES', '').split(',') if table)
+ASSIGNMENT_STRATEGY = os.environ.get('APPROVAL_ASSIGNMENT', 'least-loaded')
+REQUEST_TYPE_POOLS = json.loads(os.environ.get('APPROVAL_TYPE_POOLS', '{}'))
+APPROVAL_CHAINS = json.loads(os.environ.get('APPROVAL_CHAINS', '{}'))
+AUTO_APPROVAL_RULES = json.loads(os.environ.get('APPROVAL_AUTO_RULES', '[]'))
+AUTO_APPROVER = 'auto-approval'
+AUTO_APPROVAL_COMMENT = 'Auto-approved by rule'
+
+class LazyModule:
+    def __init__(self, name, configure=None):
+        self._name = name
+        self._configure = configure
+        self._module = None
+
+    def __getattr__(self, attribute):
+        if self._module is None:
+            module = importlib.import_module(self._name)
+            if self._configure is not None:
+                self._configure(module)
+            self._module = module
+        return getattr(self._module, attribute)
+
+def _configure_pandas(pandas):
+    if int(pandas.__version__.split('.')[0]) < 3:
+        pandas.set_option('mode.copy_on_write', True)
+
+pd = LazyModule('pandas', _configure_pandas)
+
+_request_indexes = {}
+_index_lock = threading.RLock()
+_history_analytics = {}
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+class SharedTableCache:
+    def __init__(self):
+        self._entries = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, generation, load):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == generation:
+            return entry[1]
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.RLock())
+        with key_lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                entry = (generation, load(entry[1] if entry is not None else None))
+                with self._lock:
+                    self._entries[key] = entry
+        return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_shared_tables = SharedTableCache()
+
+class FileLock:
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._handle = None
+
+    @classmethod
+    def for_path(cls, path):
+        path = os.path.abspath(path)
+        with _file_locks_guard:
+            if path not in _file_locks:
+                _file_locks[path] = cls(path)
+            return _file_locks[path]
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0 and fcntl is not None:
+            self._handle = open(self.path, 'a')
+            fcntl.flock(self._handle, fcntl.LOCK_EX)
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._depth -= 1
+        if self._depth == 0 and self._handle is not None:
+            fcntl.flock(self._handle, fcntl.LOCK_UN)
+            self._handle.close()
+            self._handle = None
+        self._thread_lock.release()
+
+REQUEST_STATUSES = ['Pending', 'Approved', 'Denied', 'Returned']
+REQUEST_TYPES = ['A', 'B', 'C', 'D', 'E', 'F']
+USER_ROLES = ['user', 'approver', 'admin']
+REVIEWER_ROLES = ['approver', 'admin']
+REQUEST_TYPE_PRIORITY = {**dict.fromkeys(REQUEST_TYPES, 0), **json.loads(os.environ.get('APPROVAL_TYPE_PRIORITY', '{}'))}
+
+class ApprovalError(Exception):
+    pass
+
+class RequestNotFoundError(ApprovalError):
+    pass
+
+class VersionConflictError(ApprovalError):
+    pass
+
+class ClaimConflictError(ApprovalError):
+    pass
+
+TABLE_SCHEMAS = {
+    'requests': {
+        'id': 'str', 'user': 'str', 'request_type': REQUEST_TYPES,
+        'title': 'str', 'description': 'str', 'status': REQUEST_STATUSES,
+        'approver_comment': 'str', 'created_at': 'datetime64[ns]', 'version': 'Int64', 'priority': 'Int64', 'assignee': 'str', 'stage': 'Int64', 'route': 'Int64', 'decided_by': 'str',
+    },
+    'users': {'username': 'str', 'role': USER_ROLES, 'approved': 'boolean'},
+    'pending_registrations': {'username': 'str', 'requested_role': USER_ROLES},
+    'deleted_requests': {
+        'id': 'str', 'user': 'str', 'request_type': REQUEST_TYPES,
+        'title': 'str', 'description': 'str', 'status': REQUEST_STATUSES,
+        'approver_comment': 'str', 'created_at': 'datetime64[ns]', 'version': 'Int64', 'priority': 'Int64', 'assignee': 'str', 'stage': 'Int64', 'route': 'Int64', 'decided_by': 'str', 'deleted_by': 'str', 'deleted_at': 'datetime64[ns]',
+    },
+    'request_history': {'request_id': 'str', 'timestamp': 'datetime64[ns]', 'action': 'category', 'user': 'str', 'details': 'str'},
+    'request_tombstones': {'request_id': 'str', 'action': ['Deleted', 'Restored'], 'user': 'str', 'timestamp': 'datetime64[ns]'},
+    'request_leases': {'request_id': 'str', 'user': 'str', 'action': ['Claimed', 'Released'], 'expires_at': 'datetime64[ns]'},
+}
+
 class DataManager:
     def __init__(self, requests_file='requests.csv', users_file='users.csv',
                  pending_registrations_file='pending_registrations.csv',
                  deleted_requests_file='deleted_requests.csv',
-                 request_history_file='request_history.csv'):
+                 request_history_file='request_history.csv',
+                 request_tombstones_file='request_tombstones.csv',
+                 request_leases_file='request_leases.csv',
+                 mmap_tables=()):
         self.requests_file = requests_file
         self.users_file = users_file
         self.pending_registrations_file = pending_registrations_file
         self.deleted_requests_file = deleted_requests_file
         self.request_history_file = request_history_file
+        self.request_tombstones_file = request_tombstones_file
+        self.request_leases_file = request_leases_file
+        data_dir = os.path.dirname(os.path.abspath(requests_file))
+        self.lock_file = os.path.join(data_dir, '.approval.lock')
+        self.generations_file = os.path.join(data_dir, '.approval_generations.json')
+        self.counters_file = os.path.join(data_dir, 'request_counters.json')
+        self.table_files = {
+            'requests': self.requests_file,
+            'users': self.users_file,
+            'pending_registrations': self.pending_registrations_file,
+            'deleted_requests': self.deleted_requests_file,
+            'request_history': self.request_history_file,
+            'request_tombstones': self.request_tombstones_file,
+            'request_leases': self.request_leases_file,
+        }
+        unknown_tables = set(mmap_tables) - set(self.table_files)
+        if unknown_tables:
+            raise ValueError(f"Unknown tables for memory mapping: {', '.join(sorted(unknown_tables))}")
+        if mmap_tables:
+            try:
+                import pyarrow
+            except ImportError as error:
+                raise ImportError("Memory-mapped tables require pyarrow. Install it with 'pip install pyarrow'.") from error
+        self.mmap_tables = tuple(mmap_tables)
         self._initialize_dataframes()
 
     def _initialize_dataframes(self):
-        if not os.path.exists(self.requests_file):
-            pd.DataFrame(columns=['id', 'user', 'request_type', 'title', 'description', 'status', 'approver_comment']).to_csv(self.requests_file, index=False)
-        if not os.path.exists(self.users_file):
-            pd.DataFrame(columns=['username', 'role', 'approved']).to_csv(self.users_file, index=False)
-        if not os.path.exists(self.pending_registrations_file):
-            pd.DataFrame(columns=['username', 'requested_role']).to_csv(self.pending_registrations_file, index=False)
-        if not os.path.exists(self.deleted_requests_file):
-            pd.DataFrame(columns=['id', 'user', 'request_type', 'title', 'description', 'status', 'approver_comment', 'deleted_by', 'deleted_at']).to_csv(self.deleted_requests_file, index=False)
-        if not os.path.exists(self.request_history_file):
-            pd.DataFrame(columns=['request_id', 'timestamp', 'action', 'user', 'details']).to_csv(self.request_history_file, index=False)
+        with self.lock():
+            for table, path in self.table_files.items():
+                if not os.path.exists(path):
+                    self._write_csv(pd.DataFrame(columns=list(TABLE_SCHEMAS[table])), path)
+
+    def lock(self):
+        return FileLock.for_path(self.lock_file)
+
+    def transaction(self):
+        return UnitOfWork(self)
+
+    def _temp_path(self, path):
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def _write_csv(self, df, path):
+        temp_path = self._temp_path(path)
+        df.to_csv(temp_path, index=False)
+        os.replace(temp_path, path)
+
+    def _read_json(self, path):
+        try:
+            with open(path) as json_file:
+                return json.load(json_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _write_json(self, data, path):
+        temp_path = self._temp_path(path)
+        with open(temp_path, 'w') as json_file:
+            json.dump(data, json_file)
+        os.replace(temp_path, path)
+
+    def generations(self):
+        return self._read_json(self.generations_file)
+
+    def generation(self, table):
+        return self.generations().get(table, 0)
+
+    def request_generation(self):
+        generations = self.generations()
+        return [generations.get('requests', 0), generations.get('request_tombstones', 0)]
+
+    def _publish_change(self, *tables):
+        with self.lock():
+            generations = self.generations()
+            for table in tables:
+                generations[table] = generations.get(table, 0) + 1
+            self._write_json(generations, self.generations_file)
+
+    def _pandas_dtype(self, dtype):
+        if isinstance(dtype, list):
+            return pd.CategoricalDtype(dtype)
+        return dtype
+
+    def _read_table(self, table):
+        return self._read_csv(table, self.table_files[table])
+
+    def _read_csv(self, table, source, **kwargs):
+        schema = TABLE_SCHEMAS[table]
+        date_columns = [column for column, dtype in schema.items() if dtype == 'datetime64[ns]']
+        dtypes = {column: ('str' if column in date_columns else self._pandas_dtype(dtype)) for column, dtype in schema.items()}
+        df = pd.read_csv(source, usecols=lambda column: column in schema, dtype=dtypes, **kwargs)
+        for column, dtype in schema.items():
+            if column not in df.columns:
+                df[column] = pd.Series(index=df.index, dtype=self._pandas_dtype(dtype))
+        for column in date_columns:
+            df[column] = pd.to_datetime(df[column], format='ISO8601', errors='coerce')
+        return df[list(schema)]
+
+    def _append_csv(self, table, df):
+        path = self.table_files[table]
+        with self.lock():
+            with open(path, newline='') as table_file:
+                columns = next(csv.reader([table_file.readline()]))
+            df.reindex(columns=columns).to_csv(path, mode='a', header=False, index=False)
+
+    def _concat_rows(self, table, *frames):
+        frames = [df for df in frames if not df.empty] or [frames[-1]]
+        if len(frames) == 1:
+            return frames[0]
+        combined = pd.concat(frames, ignore_index=True)
+        for column, dtype in TABLE_SCHEMAS[table].items():
+            if dtype == 'category':
+                combined[column] = pd.api.types.union_categoricals([df[column] for df in frames], ignore_order=True)
+        return combined
+
+    def _read_history_tail(self, previous):
+        path = self.request_history_file
+        stat = os.stat(path)
+        with open(path, 'rb') as history_file:
+            header = history_file.readline()
+            if previous is not None and previous['inode'] == stat.st_ino and previous['header'] == header and previous['offset'] <= stat.st_size:
+                history_file.seek(previous['offset'])
+                chunk = history_file.read(stat.st_size - previous['offset'])
+                consumed = chunk.rfind(b'\n') + 1
+                if not consumed:
+                    return previous
+                columns = next(csv.reader([header.decode()]))
+                new_rows = self._read_csv('request_history', io.BytesIO(chunk[:consumed]), header=None, names=columns)
+                chunks = previous['chunks'] + [new_rows]
+                while len(chunks) > 1 and len(chunks[-2]) <= 2 * len(chunks[-1]):
+                    chunks[-2:] = [self._concat_rows('request_history', *chunks[-2:])]
+                return {**previous, 'offset': previous['offset'] + consumed, 'chunks': chunks}
+        with open(path, 'rb') as history_file:
+            stat = os.fstat(history_file.fileno())
+            data = history_file.read()
+        consumed = data.rfind(b'\n') + 1
+        return {'inode': stat.st_ino, 'header': data[:data.find(b'\n') + 1], 'offset': consumed, 'chunks': [self._read_csv('request_history', io.BytesIO(data[:consumed]))]}
+
+    def _arrow_types_mapper(self, arrow_type):
+        import pyarrow as pa
+        if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+            return pd.ArrowDtype(arrow_type)
+        if pa.types.is_boolean(arrow_type):
+            return pd.BooleanDtype()
+        return None
+
+    def _open_snapshot(self, path):
+        import pyarrow as pa
+        reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+        generation = int((reader.schema.metadata or {}).get(b'generation', -1))
+        return generation, reader
+
+    def _write_snapshot(self, table, generation):
+        import pyarrow as pa
+        path = f"{self.table_files[table]}.arrow"
+        arrow_table = pa.Table.from_pandas(self._read_table(table), preserve_index=False)
+        arrow_table = arrow_table.replace_schema_metadata({**(arrow_table.schema.metadata or {}), b'generation': str(generation).encode()})
+        temp_path = self._temp_path(path)
+        with pa.OSFile(temp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+        os.replace(temp_path, path)
+
+    def _read_snapshot(self, table, generation):
+        import pyarrow as pa
+        path = f"{self.table_files[table]}.arrow"
+        try:
+            snapshot_generation, reader = self._open_snapshot(path)
+        except (FileNotFoundError, pa.ArrowInvalid):
+            snapshot_generation, reader = None, None
+        if snapshot_generation != generation:
+            self._write_snapshot(table, generation)
+            snapshot_generation, reader = self._open_snapshot(path)
+        return snapshot_generation, reader.read_all().to_pandas(types_mapper=self._arrow_types_mapper)
+
+    def _load_table(self, table):
+        generation = self.generation(table)
+        path = os.path.abspath(self.table_files[table])
+        if table == 'request_history':
+            return self.load_request_history()
+        if table in self.mmap_tables:
+            df = _shared_tables.get((path, 'mmap'), generation, lambda previous: self._read_snapshot(table, generation)[1])
+        else:
+            df = _shared_tables.get((path, 'csv'), generation, lambda previous: self._read_table(table))
+        return df.copy(deep=False)
 
     def load_requests(self):
-        return pd.read_csv(self.requests_file)
+        path = os.path.abspath(self.requests_file)
+        df = _shared_tables.get((path, 'live'), self.request_generation(), lambda previous: self._live_requests())
+        return df.copy(deep=False)
+
+    def _live_requests(self):
+        requests_df = self._load_table('requests')
+        tombstones = self.load_tombstones()
+        if tombstones.empty:
+            return requests_df
+        return requests_df[~requests_df['id'].isin(tombstones.index)].reset_index(drop=True)
+
+    def load_tombstones(self):
+        generation = self.generation('request_tombstones')
+        path = os.path.abspath(self.request_tombstones_file)
+        def build(previous):
+            latest = self._load_table('request_tombstones').drop_duplicates('request_id', keep='last')
+            return latest[latest['action'] == 'Deleted'].set_index('request_id', drop=False)
+        return _shared_tables.get((path, 'active'), generation, build).copy(deep=False)
+
+    def load_indexed(self, table, column):
+        generation = self.generation(table)
+        path = os.path.abspath(self.table_files[table])
+        df = _shared_tables.get((path, 'indexed', column), generation, lambda previous: self._load_table(table).set_index(column, drop=False))
+        return df.copy(deep=False)
+
+    def _sort_keys(self, df, columns):
+        return sorted((tuple('' if pd.isna(value) else str(value) for value in row), position) for position, row in enumerate(df[columns].itertuples(index=False)))
+
+    def load_sorted(self, table, columns):
+        generation = self.generation(table)
+        path = os.path.abspath(self.table_files[table])
+        def build(previous):
+            df = self._load_table(table)
+            keys = self._sort_keys(df, columns)
+            return df.take([position for _, position in keys]).reset_index(drop=True), [key for key, _ in keys]
+        df, keys = _shared_tables.get((path, 'sorted', tuple(columns)), generation, build)
+        return df.copy(deep=False), keys
+
+    def load_counters(self):
+        return self._read_json(self.counters_file)
+
+    def save_counters(self, counters):
+        with self.lock():
+            self._write_json(counters, self.counters_file)
 
     def load_users(self):
-        return pd.read_csv(self.users_file)
+        return self._load_table('users')
+
+    def load_approvers(self):
+        generation = self.generation('users')
+        path = os.path.abspath(self.users_file)
+        def build(previous):
+            users_df = self._load_table('users')
+            reviewers = users_df['role'].isin(REVIEWER_ROLES) & users_df['approved'].fillna(False).astype(bool)
+            return sorted(users_df.loc[reviewers, 'username'])
+        return _shared_tables.get((path, 'approvers'), generation, build)
 
     def load_pending_registrations(self):
-        return pd.read_csv(self.pending_registrations_file)
+        return self._load_table('pending_registrations')
 
-    def load_deleted_requests(self):
-        return pd.read_csv(self.deleted_requests_file)
+    def load_leases(self):
+        generation = self.generation('request_leases')
+        path = os.path.abspath(self.request_leases_file)
+        return _shared_tables.get((path, 'leases'), generation, lambda previous: LeaseTable.build(self._load_table('request_leases')))
 
-    def load_request_history(self):
-        return pd.read_csv(self.request_history_file)
+    def load_deleted_requests(self):
+        archived = self._load_table('deleted_requests')
+        tombstones = self.load_tombstones()
+        if tombstones.empty:
+            return archived
+        tombstoned = self.load_indexed('requests', 'id').loc[tombstones.index].reset_index(drop=True)
+        tombstoned['deleted_by'] = tombstones['user'].values
+        tombstoned['deleted_at'] = tombstones['timestamp'].values
+        return self._concat_rows('deleted_requests', archived, tombstoned[list(TABLE_SCHEMAS['deleted_requests'])])
+
+    def _history_tail(self):
+        path = os.path.abspath(self.request_history_file)
+        return _shared_tables.get((path, 'tail'), self.generation('request_history'), self._read_history_tail)
+
+    def request_history_rows(self):
+        return sum(len(chunk) for chunk in self._history_tail()['chunks'])
+
+    def load_request_history(self, since=0):
+        tail = self._history_tail()
+        chunks, start = [], 0
+        for chunk in tail['chunks']:
+            if start + len(chunk) > since:
+                chunks.append(chunk.iloc[max(since - start, 0):])
+            start += len(chunk)
+        if not chunks:
+            return tail['chunks'][-1].iloc[:0].reset_index(drop=True)
+        df = self._concat_rows('request_history', *chunks)
+        if since:
+            return df.reset_index(drop=True)
+        if len(tail['chunks']) > 1:
+            tail['chunks'] = [df]
+        return df.copy(deep=False)
 
     def save_requests(self, df):
-        df.to_csv(self.requests_file, index=False)
+        with self.lock():
+            self._write_csv(df, self.requests_file)
+            self._publish_change('requests')
 
     def save_users(self, df):
-        df.to_csv(self.users_file, index=False)
+        with self.lock():
+            self._write_csv(df, self.users_file)
+            self._publish_change('users')
 
     def save_pending_registrations(self, df):
-        df.to_csv(self.pending_registrations_file, index=False)
+        with self.lock():
+            self._write_csv(df, self.pending_registrations_file)
+            self._publish_change('pending_registrations')
 
     def save_deleted_requests(self, df):
-        df.to_csv(self.deleted_requests_file, index=False)
+        with self.lock():
+            self._write_csv(df, self.deleted_requests_file)
+            self._publish_change('deleted_requests')
 
     def save_request_history(self, df):
-        df.to_csv(self.request_history_file, index=False)
+        with self.lock():
+            self._write_csv(df, self.request_history_file)
+            self._publish_change('request_history')
 
-class RequestManager:
+class UnitOfWork:
     def __init__(self, data_manager):
         self.data_manager = data_manager
+        self.context = {}
+        self._lock = data_manager.lock()
+        self._frames = {}
+        self._dirty = []
+        self._appends = defaultdict(list)
+        self._commit_callbacks = []
+
+    def __enter__(self):
+        self._lock.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.commit()
+        finally:
+            self._lock.__exit__(exc_type, exc_value, traceback)
+
+    def load(self, table):
+        if table not in self._frames:
+            self._frames[table] = self.data_manager._load_table(table)
+        return self._frames[table]
+
+    def stage(self, table, df):
+        self._frames[table] = df
+        if table not in self._dirty:
+            self._dirty.append(table)
+
+    def append(self, table, row):
+        self._appends[table].append(row)
+
+    def log(self, request_id, action, user, details=None):
+        self.append('request_history', {'request_id': request_id, 'timestamp': datetime.now(), 'action': action, 'user': user, 'details': details})
+
+    def on_commit(self, callback):
+        self._commit_callbacks.append(callback)
+
+    def commit(self):
+        written = []
+        try:
+            for table in self._dirty:
+                path = self.data_manager.table_files[table]
+                temp_path = self.data_manager._temp_path(path)
+                self._frames[table].to_csv(temp_path, index=False)
+                written.append((temp_path, path))
+        except Exception:
+            for temp_path, path in written:
+                os.remove(temp_path)
+            raise
+        for temp_path, path in written:
+            os.replace(temp_path, path)
+        changed = list(self._dirty)
+        for table, rows in self._appends.items():
+            self.data_manager._append_csv(table, pd.DataFrame(rows))
+            if table not in changed:
+                changed.append(table)
+        self._appends.clear()
+        if changed:
+            self.data_manager._publish_change(*changed)
+        self._dirty = []
+        for callback in self._commit_callbacks:
+            callback()
+        self._commit_callbacks = []
+
+class SearchIndex:
+    FIELDS = ['title', 'description', 'approver_comment']
+    TOKEN_PATTERN = re.compile(r'\w+')
+    K1 = 1.2
+    B = 0.75
 
-    def generate_request_id(self, request_type):
-        now = datetime.now()
-        month_char_map = {
-            1: '1', 2: '2', 3: '3', 4: '4', 5: '5', 6: '6', 7: '7', 8: '8', 9: '9',
-            10: 'A', 11: 'B', 12: 'C'
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.document_terms = {}
+        self.document_lengths = {}
+        self.total_length = 0
+
+    @classmethod
+    def build(cls, requests_df):
+        index = cls()
+        for row in requests_df[['id'] + cls.FIELDS].itertuples(index=False):
+            index.add(row[0], dict(zip(cls.FIELDS, row[1:])))
+        return index
+
+    def tokenize(self, text):
+        return self.TOKEN_PATTERN.findall(text.lower())
+
+    def add(self, request_id, fields):
+        self.remove(request_id)
+        terms = Counter()
+        for field in self.FIELDS:
+            value = fields.get(field)
+            if isinstance(value, str):
+                terms.update(self.tokenize(value))
+        length = sum(terms.values())
+        for term, frequency in terms.items():
+            self.postings[term].setdefault((frequency, length), set()).add(request_id)
+        self.document_terms[request_id] = dict(terms)
+        self.document_lengths[request_id] = length
+        self.total_length += length
+
+    def remove(self, request_id):
+        length = self.document_lengths.pop(request_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term, frequency in self.document_terms.pop(request_id).items():
+            groups = self.postings[term]
+            groups[(frequency, length)].discard(request_id)
+            if not groups[(frequency, length)]:
+                del groups[(frequency, length)]
+                if not groups:
+                    del self.postings[term]
+
+    def search(self, query, limit=20):
+        with _index_lock:
+            terms = list(dict.fromkeys(self.tokenize(query)))
+            if limit < 1 or not terms or not self.document_lengths or any(term not in self.postings for term in terms):
+                return []
+            document_frequency = {term: sum(map(len, self.postings[term].values())) for term in terms}
+            terms.sort(key=document_frequency.__getitem__)
+            document_count = len(self.document_lengths)
+            average_length = self.total_length / document_count or 1
+            weights = {term: math.log(1 + (document_count - frequency + 0.5) / (frequency + 0.5)) for term, frequency in document_frequency.items()}
+
+            def contribution(term, frequency, length):
+                return weights[term] * frequency * (self.K1 + 1) / (frequency + self.K1 * (1 - self.B + self.B * length / average_length))
+
+            lead, others = terms[0], terms[1:]
+            max_frequency = {term: {} for term in others}
+            for term in others:
+                for frequency, length in self.postings[term]:
+                    max_frequency[term][length] = max(frequency, max_frequency[term].get(length, 0))
+            groups = sorted(((contribution(lead, frequency, length) + sum(contribution(term, max_frequency[term][length], length) for term in others), frequency, length)
+                             for frequency, length in self.postings[lead] if all(length in max_frequency[term] for term in others)), reverse=True)
+            top = []
+            for bound, frequency, length in groups:
+                if len(top) == limit and bound <= top[0][0]:
+                    break
+                base = contribution(lead, frequency, length)
+                for request_id in self.postings[lead][(frequency, length)]:
+                    if len(top) == limit and bound <= top[0][0]:
+                        break
+                    document_terms = self.document_terms[request_id]
+                    if not all(term in document_terms for term in others):
+                        continue
+                    score = base + sum(contribution(term, document_terms[term], length) for term in others)
+                    if len(top) < limit:
+                        heapq.heappush(top, (score, request_id))
+                    elif score > top[0][0]:
+                        heapq.heapreplace(top, (score, request_id))
+            return [(request_id, score) for score, request_id in sorted(top, reverse=True)]
+
+class RequestIdIndex:
+    def __init__(self, request_ids=()):
+        self.ids = sorted(set(request_ids))
+
+    @classmethod
+    def build(cls, requests_df):
+        return cls(requests_df['id'].dropna().astype(str))
+
+    def add(self, request_id):
+        position = bisect.bisect_left(self.ids, request_id)
+        if position == len(self.ids) or self.ids[position] != request_id:
+            self.ids.insert(position, request_id)
+
+    def add_many(self, request_ids):
+        self.ids = sorted(set(self.ids).union(request_ids))
+
+    def remove(self, request_id):
+        position = bisect.bisect_left(self.ids, request_id)
+        if position < len(self.ids) and self.ids[position] == request_id:
+            del self.ids[position]
+
+    def lookup(self, prefix, limit=50):
+        with _index_lock:
+            prefix = prefix.strip().upper()
+            start = bisect.bisect_left(self.ids, prefix)
+            end = bisect.bisect_left(self.ids, prefix + '\uffff', lo=start)
+            return self.ids[start:min(end, start + limit)], end - start
+
+class RequestFilterIndex:
+    COLUMNS = {'status': 'status', 'user': 'user', 'type': 'request_type', 'assignee': 'assignee', 'stage': 'stage'}
+
+    def __init__(self):
+        self.postings = {predicate: defaultdict(set) for predicate in self.COLUMNS}
+        self.values = {}
+        self.created = []
+        self.created_keys = {}
+
+    @classmethod
+    def build(cls, requests_df):
+        index = cls()
+        request_ids = requests_df['id']
+        for predicate, column in cls.COLUMNS.items():
+            for value, group in request_ids.groupby(requests_df[column], observed=True):
+                index.postings[predicate][value] = set(group)
+        index.values = dict(zip(request_ids.tolist(), zip(*(requests_df[column].tolist() for column in cls.COLUMNS.values()))))
+        created = pd.to_datetime(requests_df['created_at']).to_numpy(dtype='datetime64[ns]').view('int64')
+        keys = list(zip(created.tolist(), request_ids.tolist()))
+        index.created_keys = dict(zip(request_ids.tolist(), keys))
+        index.created = sorted(keys)
+        return index
+
+    def add(self, request_id, fields):
+        self.remove(request_id)
+        values = tuple(fields.get(column) for column in self.COLUMNS.values())
+        for predicate, value in zip(self.COLUMNS, values):
+            if pd.notna(value):
+                self.postings[predicate][value].add(request_id)
+        self.values[request_id] = values
+        key = (pd.Timestamp(fields.get('created_at')).value, request_id)
+        self.created_keys[request_id] = key
+        bisect.insort(self.created, key)
+
+    def add_many(self, requests_df):
+        batch = self.build(requests_df)
+        for request_id in batch.values.keys() & self.values.keys():
+            self.remove(request_id)
+        for predicate, postings in batch.postings.items():
+            for value, request_ids in postings.items():
+                self.postings[predicate][value] |= request_ids
+        self.values.update(batch.values)
+        self.created_keys.update(batch.created_keys)
+        self.created = list(heapq.merge(self.created, batch.created))
+
+    def remove(self, request_id):
+        for predicate, value in zip(self.COLUMNS, self.values.pop(request_id, ())):
+            if pd.notna(value):
+                self.postings[predicate][value].discard(request_id)
+        key = self.created_keys.pop(request_id, None)
+        position = bisect.bisect_left(self.created, key) if key is not None else len(self.created)
+        if position < len(self.created) and self.created[position] == key:
+            del self.created[position]
+
+    def _candidates(self, predicate, value):
+        if predicate == 'created_between':
+            start, end = value
+            low = bisect.bisect_left(self.created, (pd.Timestamp(start).value if start is not None else pd.NaT.value + 1, ''))
+            high = bisect.bisect_right(self.created, (pd.Timestamp(end).value if end is not None else 2 ** 63, '\uffff'))
+            return {request_id for _, request_id in self.created[low:high]}
+        if predicate not in self.postings:
+            raise ValueError(f"Unknown request predicate: {predicate}")
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        postings = self.postings[predicate]
+        return set().union(*(postings.get(item, set()) for item in values))
+
+    def match(self, predicates):
+        with _index_lock:
+            candidate_sets = sorted((self._candidates(predicate, value) for predicate, value in predicates.items()), key=len)
+            if not candidate_sets:
+                return None
+            matches = set(candidate_sets[0])
+            for candidates in candidate_sets[1:]:
+                matches &= candidates
+                if not matches:
+                    break
+            return matches
+
+class RequestPriorityIndex:
+    def __init__(self):
+        self.heap = []
+        self.keys = {}
+
+    @staticmethod
+    def key(request_id, fields):
+        priority = fields.get('priority')
+        if pd.isna(priority):
+            priority = REQUEST_TYPE_PRIORITY.get(fields.get('request_type'), 0)
+        return (-int(priority), pd.Timestamp(fields.get('created_at')).value, request_id)
+
+    @classmethod
+    def build(cls, requests_df):
+        index = cls()
+        pending = requests_df[requests_df['status'] == 'Pending']
+        type_priority = pending['request_type'].astype(object).map(REQUEST_TYPE_PRIORITY).fillna(0)
+        priority = pending['priority'].astype('Float64').fillna(type_priority).astype('int64')
+        created = pd.to_datetime(pending['created_at']).to_numpy(dtype='datetime64[ns]').view('int64')
+        index.heap = list(zip((-priority).tolist(), created.tolist(), pending['id'].tolist()))
+        index.keys = {key[2]: key for key in index.heap}
+        heapq.heapify(index.heap)
+        return index
+
+    def add(self, request_id, fields):
+        if fields.get('status') != 'Pending':
+            self.remove(request_id)
+            return
+        key = self.key(request_id, fields)
+        if self.keys.get(request_id) != key:
+            self.keys[request_id] = key
+            heapq.heappush(self.heap, key)
+
+    def add_many(self, requests_df):
+        batch = self.build(requests_df)
+        for request_id in requests_df['id'][requests_df['status'] != 'Pending']:
+            self.remove(request_id)
+        self.keys.update(batch.keys)
+        self.heap.extend(batch.heap)
+        heapq.heapify(self.heap)
+
+    def remove(self, request_id, fields=None):
+        if self.keys.pop(request_id, None) is not None and len(self.heap) > 2 * len(self.keys) + 64:
+            self.heap = list(self.keys.values())
+            heapq.heapify(self.heap)
+
+    def top(self, limit, accept=None):
+        with _index_lock:
+            request_ids = []
+            seen = set()
+            frontier = [(self.heap[0], 0)] if self.heap else []
+            while frontier and len(request_ids) < limit:
+                key, position = heapq.heappop(frontier)
+                request_id = key[2]
+                if self.keys.get(request_id) == key and request_id not in seen and (accept is None or accept(request_id)):
+                    seen.add(request_id)
+                    request_ids.append(request_id)
+                for child in (2 * position + 1, 2 * position + 2):
+                    if child < len(self.heap):
+                        heapq.heappush(frontier, (self.heap[child], child))
+            return request_ids
+
+class RequestQuery:
+    def __init__(self, request_manager, predicates=None, excluded=frozenset()):
+        self.request_manager = request_manager
+        self.predicates = predicates or {}
+        self.excluded = excluded
+
+    def where(self, **predicates):
+        return RequestQuery(self.request_manager, {**self.predicates, **predicates}, self.excluded)
+
+    def excluding(self, request_ids):
+        return RequestQuery(self.request_manager, self.predicates, self.excluded | frozenset(request_ids))
+
+    def ids(self):
+        filter_index, id_index = self.request_manager.filter_index, self.request_manager.id_index
+        with _index_lock:
+            matches = filter_index.match(self.predicates)
+            if self.excluded:
+                matches = (set(id_index.ids) if matches is None else matches) - self.excluded
+            return matches
+
+    def count(self):
+        matches = self.ids()
+        return len(self.request_manager.id_index.ids) if matches is None else len(matches)
+
+    def _rows(self, request_ids, keep_order=False):
+        requests_df = self.request_manager.data_manager.load_indexed('requests', 'id')
+        positions = requests_df.index.get_indexer_for(list(request_ids))
+        positions = positions[positions >= 0]
+        return requests_df.take(positions if keep_order else sorted(positions)).reset_index(drop=True)
+
+    def top(self, limit=50):
+        predicates = dict(self.predicates)
+        if predicates.pop('status', 'Pending') != 'Pending':
+            raise ValueError("Only pending requests are prioritized.")
+        filter_index, priority_index = self.request_manager.filter_index, self.request_manager.priority_index
+        with _index_lock:
+            matches = filter_index.match(predicates)
+            if matches is None:
+                request_ids = priority_index.top(limit, lambda request_id: request_id not in self.excluded)
+            else:
+                keys = (priority_index.keys[request_id] for request_id in matches - self.excluded if request_id in priority_index.keys)
+                request_ids = [key[2] for key in heapq.nsmallest(limit, keys)]
+        return self._rows(request_ids, keep_order=True)
+
+    def to_frame(self):
+        matches = self.ids()
+        if matches is None:
+            return self.request_manager.data_manager.load_requests()
+        return self._rows(matches)
+
+    def page(self, after_id=None, limit=50, order_by='id'):
+        if order_by == 'id':
+            keys, key_of = self.request_manager.id_index.ids, lambda request_id: request_id
+        elif order_by == 'created_at':
+            created_keys = self.request_manager.filter_index.created_keys
+            keys, key_of = self.request_manager.filter_index.created, created_keys.get
+            if after_id is not None and after_id not in created_keys:
+                raise ValueError(f"Unknown page cursor: {after_id}")
+        else:
+            raise ValueError(f"Cannot page requests by: {order_by}")
+        matches = self.ids()
+        with _index_lock:
+            cursor = key_of(after_id) if after_id is not None else None
+            if matches is None:
+                start = bisect.bisect_right(keys, cursor) if cursor is not None else 0
+                page_keys = keys[start:start + limit]
+            else:
+                page_keys = heapq.nsmallest(limit, (key for key in map(key_of, matches) if cursor is None or key > cursor))
+        return self._rows([key if order_by == 'id' else key[1] for key in page_keys], keep_order=True)
+
+class RequestCounters:
+    OPEN_STATUSES = ['Pending', 'Returned']
+    DAY_ACTIONS = ['Created', 'Deleted', 'Restored', 'Pending', 'Approved', 'Denied', 'Returned']
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.generation = data.get('generation')
+        self.status = Counter(data.get('status', {}))
+        self.type = Counter(data.get('type', {}))
+        self.user = defaultdict(Counter, {user: Counter(counts) for user, counts in data.get('user', {}).items()})
+        self.day = defaultdict(Counter, {day: Counter(counts) for day, counts in data.get('day', {}).items()})
+        self.ids = Counter(data['ids']) if 'ids' in data else None
+        self.assignee = defaultdict(Counter, {assignee: Counter(counts) for assignee, counts in data['assignee'].items()}) if 'assignee' in data else None
+        self.auto = Counter(data['auto']) if 'auto' in data else None
+
+    ID_DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    ID_INCREMENTS = {char: value for value, char in enumerate(ID_DIGITS)}
+
+    @classmethod
+    def build(cls, requests_df, history_df, deleted_requests_df=None):
+        counters = cls()
+        counters.status.update({status: int(count) for status, count in requests_df['status'].value_counts().items() if count})
+        counters.type.update({request_type: int(count) for request_type, count in requests_df['request_type'].value_counts().items() if count})
+        for (user, status), count in requests_df.groupby(['user', 'status'], observed=True).size().items():
+            counters.user[user][status] += int(count)
+        counters.assignee = defaultdict(Counter)
+        for (assignee, status), count in requests_df.groupby(['assignee', 'status'], observed=True).size().items():
+            counters.assignee[assignee][status] += int(count)
+        auto_approved = (requests_df['status'] == 'Approved') & (requests_df['decided_by'] == AUTO_APPROVER)
+        counters.auto = Counter({user: int(count) for user, count in requests_df.loc[auto_approved, 'user'].value_counts().items() if count})
+        history_df = history_df[history_df['action'].isin(cls.DAY_ACTIONS)]
+        days = history_df['timestamp'].dt.strftime('%Y-%m-%d')
+        for (day, action), count in history_df.groupby([days, history_df['action']], observed=True).size().items():
+            counters.day[day][action] += int(count)
+        known_ids = [requests_df['id'], history_df.loc[history_df['action'] == 'Created', 'request_id']]
+        if deleted_requests_df is not None:
+            known_ids.append(deleted_requests_df['id'])
+        created_ids = pd.concat(known_ids).dropna().astype(str)
+        counters.ids = Counter(cls.id_increments(created_ids))
+        return counters
+
+    @classmethod
+    def id_increments(cls, request_ids):
+        request_ids = request_ids[request_ids.str.len() >= 3]
+        increments = request_ids.str[2].str.upper().map(cls.ID_INCREMENTS).fillna(0)
+        wide = request_ids.str.len() > 4
+        increments[wide] = request_ids[wide].str[2:].map(cls.parse_increment)
+        return {prefix: int(increment) for prefix, increment in increments.groupby(request_ids.str[:2]).max().items()}
+
+    @classmethod
+    def parse_increment(cls, digits):
+        try:
+            return int(digits, 36)
+        except ValueError:
+            return 0
+
+    @classmethod
+    def format_increment(cls, increment):
+        if increment < len(cls.ID_DIGITS):
+            return f"{cls.ID_DIGITS[increment]}0"
+        digits = ''
+        while increment:
+            increment, digit = divmod(increment, len(cls.ID_DIGITS))
+            digits = cls.ID_DIGITS[digit] + digits
+        return digits.rjust(3, '0')
+
+    def next_id(self, prefix):
+        self.ids[prefix] += 1
+        return self.ids[prefix]
+
+    def reserve_ids(self, prefix, count):
+        start = self.ids[prefix]
+        self.ids[prefix] += count
+        return range(start + 1, start + count + 1)
+
+    def to_dict(self):
+        return {
+            'generation': self.generation,
+            'status': dict(self.status),
+            'type': dict(self.type),
+            'user': {user: dict(counts) for user, counts in self.user.items()},
+            'day': {day: dict(counts) for day, counts in self.day.items()},
+            'ids': dict(self.ids or {}),
+            'assignee': {assignee: dict(counts) for assignee, counts in (self.assignee or {}).items()},
+            'auto': dict(self.auto or {}),
         }
-        month_char = month_char_map[now.month]
 
-        increment_char_map = {
-            i + 1: str(i + 1) if i < 9 else chr(ord('A') + (i - 9)) for i in range(36)
+    @staticmethod
+    def auto_approved(request):
+        return request['status'] == 'Approved' and request.get('decided_by') == AUTO_APPROVER
+
+    def human_decisions(self, user):
+        counts = self.user.get(user, Counter())
+        approved = counts['Approved'] - self.auto[user]
+        return approved, approved + counts['Denied']
+
+    def record_created(self, user, request_type, day, assignee=None):
+        self.status['Pending'] += 1
+        self.type[request_type] += 1
+        self.user[user]['Pending'] += 1
+        self.day[day]['Created'] += 1
+        if pd.notna(assignee):
+            self.assignee[assignee]['Pending'] += 1
+
+    def record_status_change(self, user, old_status, new_status, day, assignee=None, auto=False):
+        self.status[old_status] -= 1
+        self.status[new_status] += 1
+        self.user[user][old_status] -= 1
+        self.user[user][new_status] += 1
+        self.day[day][new_status] += 1
+        if pd.notna(assignee):
+            self.assignee[assignee][old_status] -= 1
+            self.assignee[assignee][new_status] += 1
+        if auto:
+            self.auto[user] -= 1
+
+    def record_auto_approved(self, user):
+        self.auto[user] += 1
+
+    def record_deleted(self, user, request_type, status, day, assignee=None, auto=False):
+        self.status[status] -= 1
+        self.type[request_type] -= 1
+        self.user[user][status] -= 1
+        self.day[day]['Deleted'] += 1
+        if pd.notna(assignee):
+            self.assignee[assignee][status] -= 1
+        if auto:
+            self.auto[user] -= 1
+
+    def record_reassigned(self, old_assignee, new_assignee, status):
+        if pd.notna(old_assignee):
+            self.assignee[old_assignee][status] -= 1
+        if pd.notna(new_assignee):
+            self.assignee[new_assignee][status] += 1
+
+    def record_restored(self, user, request_type, status, day, assignee=None, auto=False):
+        self.status[status] += 1
+        self.type[request_type] += 1
+        self.user[user][status] += 1
+        self.day[day]['Restored'] += 1
+        if pd.notna(assignee):
+            self.assignee[assignee][status] += 1
+        if auto:
+            self.auto[user] += 1
+
+    def open_count(self, user):
+        return sum(self.user.get(user, Counter())[status] for status in self.OPEN_STATUSES)
+
+class ApprovalAnalytics:
+    START_ACTIONS = ['Created', 'Pending', 'Advanced', 'Restored']
+    DECISION_ACTIONS = ['Approved', 'Denied', 'Returned', 'Advanced']
+    CLOSE_ACTIONS = DECISION_ACTIONS + ['Deleted']
+    SLA_HOURS = 48
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.rows = 0
+        self.last_timestamp = None
+        self.open_since = {}
+        self.deleted_open = {}
+        self.wait_batches = []
+        self.approvers = pd.DataFrame(columns=['decisions', 'total_wait_seconds', 'max_wait_seconds'] + self.DECISION_ACTIONS, dtype='float64')
+        self.returns = pd.Series(dtype='float64')
+        self.resubmits = pd.Series(dtype='float64')
+
+    def refresh(self, history_df):
+        with self._lock:
+            self._refresh(history_df, 0)
+        return self
+
+    def sync(self, load_history):
+        with self._lock:
+            since = max(self.rows - 1, 0)
+            history_df = load_history(since)
+            if since and (history_df.empty or history_df['timestamp'].iat[0] != self.last_timestamp):
+                since, history_df = 0, load_history(0)
+            self._refresh(history_df, since)
+        return self
+
+    def _refresh(self, history_df, offset):
+        rows = offset + len(history_df)
+        if rows < self.rows or (self.rows and history_df['timestamp'].iat[self.rows - 1 - offset] != self.last_timestamp):
+            self._reset()
+        if rows > self.rows:
+            self._apply(history_df.iloc[self.rows - offset:])
+            self.rows = rows
+            self.last_timestamp = history_df['timestamp'].iat[-1]
+
+    def _apply(self, events):
+        actions = events['action'].astype(str)
+        self.returns = self.returns.add(events.loc[actions == 'Returned', 'request_id'].value_counts(), fill_value=0)
+        self.resubmits = self.resubmits.add(events.loc[actions == 'Resubmitted', 'request_id'].value_counts(), fill_value=0)
+
+        tracked = actions.isin(self.START_ACTIONS + self.CLOSE_ACTIONS)
+        deleted_ids = list(self.deleted_open) * 2
+        deleted_actions = ['Pending'] * len(self.deleted_open) + ['Deleted'] * len(self.deleted_open)
+        carried = pd.DataFrame({
+            'request_id': list(self.open_since) + deleted_ids,
+            'timestamp': list(self.open_since.values()) + list(self.deleted_open.values()) * 2,
+            'action': ['Pending'] * len(self.open_since) + deleted_actions,
+            'user': None,
+        })
+        current = pd.DataFrame({'request_id': events['request_id'][tracked], 'timestamp': events['timestamp'][tracked], 'action': actions[tracked], 'user': events['user'][tracked]})
+        timeline = pd.concat([carried, current], ignore_index=True) if len(carried) else current.reset_index(drop=True)
+        timeline = timeline.sort_values('request_id', kind='stable')
+
+        grouped = timeline.groupby('request_id', sort=False)
+        lifecycle = timeline['action'].where(~timeline['action'].isin(['Deleted', 'Restored'])).groupby(timeline['request_id'], sort=False).ffill()
+        starts = timeline['action'].isin(self.START_ACTIONS) & lifecycle.isin(self.START_ACTIONS)
+        previous_start = starts.groupby(timeline['request_id'], sort=False).shift(fill_value=False)
+        previous_timestamp = grouped['timestamp'].shift()
+        decided = timeline['action'].isin(self.DECISION_ACTIONS) & previous_start & (timeline['user'] != AUTO_APPROVER)
+        waits = pd.DataFrame({
+            'approver': timeline['user'][decided],
+            'action': timeline['action'][decided],
+            'wait_seconds': (timeline['timestamp'][decided] - previous_timestamp[decided]).dt.total_seconds(),
+        })
+        if not waits.empty:
+            self.wait_batches.append(waits['wait_seconds'])
+            batch = waits.groupby('approver').agg(decisions=('wait_seconds', 'size'), total_wait_seconds=('wait_seconds', 'sum'), max_wait_seconds=('wait_seconds', 'max'))
+            batch = batch.join(pd.crosstab(waits['approver'], waits['action'])).reindex(columns=self.approvers.columns, fill_value=0)
+            max_wait = pd.concat([self.approvers['max_wait_seconds'], batch['max_wait_seconds']], axis=1).max(axis=1)
+            self.approvers = self.approvers.add(batch, fill_value=0)
+            self.approvers['max_wait_seconds'] = max_wait
+
+        last = timeline.drop_duplicates('request_id', keep='last')
+        still_open = starts[last.index]
+        paused = (last['action'] == 'Deleted') & lifecycle[last.index].isin(self.START_ACTIONS)
+        for request_id in last['request_id'][~still_open]:
+            self.open_since.pop(request_id, None)
+        for request_id in last['request_id'][~paused]:
+            self.deleted_open.pop(request_id, None)
+        self.open_since.update(zip(last['request_id'][still_open], last['timestamp'][still_open]))
+        self.deleted_open.update(zip(last['request_id'][paused], last['timestamp'][paused]))
+
+    def wait_seconds(self):
+        if len(self.wait_batches) > 1:
+            self.wait_batches = [pd.concat(self.wait_batches, ignore_index=True)]
+        return self.wait_batches[0] if self.wait_batches else pd.Series(dtype='float64')
+
+    def summary(self, sla_hours=None, now=None):
+        sla_seconds = (sla_hours or self.SLA_HOURS) * 3600
+        waits = self.wait_seconds()
+        open_ages = (pd.Timestamp(now or datetime.now()) - pd.Series(list(self.open_since.values()), dtype='datetime64[ns]')).dt.total_seconds()
+        return {
+            'decisions': len(waits),
+            'median_wait_hours': float(waits.median()) / 3600 if len(waits) else None,
+            'p90_wait_hours': float(waits.quantile(0.9)) / 3600 if len(waits) else None,
+            'within_sla': float((waits <= sla_seconds).mean()) if len(waits) else None,
+            'open_pending': len(open_ages),
+            'oldest_open_hours': float(open_ages.max()) / 3600 if len(open_ages) else None,
+            'open_over_sla': int((open_ages > sla_seconds).sum()),
+            'returned_requests': int((self.returns > 0).sum()),
+            'max_return_loops': int(self.returns.max()) if len(self.returns) else 0,
+            'resubmissions': int(self.resubmits.sum()),
         }
 
-        requests_df = self.data_manager.load_requests()
-        filtered_df = requests_df[(requests_df['id'].str.startswith(f'{request_type}{month_char}'))]
-        increment = len(filtered_df) + 1
-        increment_str = increment_char_map.get(increment, 'Z')
+    def approver_turnaround(self):
+        table = self.approvers.copy()
+        table['mean_turnaround_hours'] = table['total_wait_seconds'] / table['decisions'] / 3600
+        table['max_turnaround_hours'] = table['max_wait_seconds'] / 3600
+        table[['decisions'] + self.DECISION_ACTIONS] = table[['decisions'] + self.DECISION_ACTIONS].astype('int64')
+        return table.drop(columns=['total_wait_seconds', 'max_wait_seconds']).sort_values('decisions', ascending=False)
+
+    def return_loops(self):
+        return self.returns.astype('int64').value_counts().sort_index().rename_axis('returns').rename('requests')
+
+class RoundRobinAssignment:
+    def choose(self, request_type, approvers, loads, assigned):
+        return approvers[assigned % len(approvers)]
+
+class LeastLoadedAssignment:
+    def choose(self, request_type, approvers, loads, assigned):
+        return min(approvers, key=lambda approver: (loads.get(approver, 0), approver))
+
+class TypePoolAssignment:
+    def __init__(self, pools=None, fallback=None):
+        self.pools = REQUEST_TYPE_POOLS if pools is None else pools
+        self.fallback = fallback or LeastLoadedAssignment()
+
+    def choose(self, request_type, approvers, loads, assigned):
+        available = set(approvers)
+        pool = [approver for approver in self.pools.get(request_type, ()) if approver in available]
+        return self.fallback.choose(request_type, pool or approvers, loads, assigned)
+
+ASSIGNMENT_STRATEGIES = {'round-robin': RoundRobinAssignment, 'least-loaded': LeastLoadedAssignment, 'type-pools': TypePoolAssignment}
+
+class ApprovalStage:
+    OPERATORS = {
+        '==': operator.eq, '!=': operator.ne, '>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le,
+        'in': lambda value, options: value in options,
+        'contains': lambda value, text: str(text).lower() in str(value).lower(),
+    }
+
+    def __init__(self, stage, roles=None, approvers=None, when=()):
+        self.name = stage
+        self.roles = roles
+        self.approvers = approvers
+        when = [when] if isinstance(when, dict) else when
+        unknown = [condition['op'] for condition in when if condition['op'] not in self.OPERATORS]
+        if unknown:
+            raise ApprovalError(f"Unknown operator(s) in approval stage '{stage}': {', '.join(unknown)}")
+        self.conditions = [(condition['field'], self.OPERATORS[condition['op']], condition['value']) for condition in when]
+
+    def applies(self, request):
+        return all(pd.notna(request.get(field)) and check(request.get(field), value) for field, check, value in self.conditions)
+
+    @property
+    def restricted(self):
+        return self.roles is not None or self.approvers is not None
+
+    def allows(self, user, role):
+        return (self.approvers is None or user in self.approvers) and (self.roles is None or role in self.roles)
+
+class ApprovalWorkflow:
+    def __init__(self, chains=None):
+        chains = APPROVAL_CHAINS if chains is None else chains
+        self.stages = {}
+        self.first = {}
+        self.table = {}
+        for request_type, stages in chains.items():
+            if request_type not in REQUEST_TYPES:
+                raise ApprovalError(f"Approval chain for unknown request type: {request_type}")
+            self.stages[request_type] = [ApprovalStage(**stage) for stage in stages]
+            self._compile(request_type)
+
+    def _compile(self, request_type):
+        stages = self.stages[request_type]
+        required = sum(1 << position for position, stage in enumerate(stages) if not stage.conditions)
+        optional = [position for position, stage in enumerate(stages) if stage.conditions]
+        for choice in range(1 << len(optional)):
+            route = required | sum(1 << position for bit, position in enumerate(optional) if choice >> bit & 1)
+            active = [position for position in range(len(stages)) if route >> position & 1]
+            self.first[(request_type, route)] = active[0] if active else None
+            for following, position in zip(active[1:] + [None], active):
+                self.table[(request_type, route, position, 'Approved')] = ('Approved', None) if following is None else ('Pending', following)
+                self.table[(request_type, route, position, 'Denied')] = ('Denied', None)
+                self.table[(request_type, route, position, 'Returned')] = ('Returned', None)
+
+    def route(self, request):
+        stages = self.stages.get(request['request_type'])
+        if not stages:
+            return None
+        return sum(1 << position for position, stage in enumerate(stages) if stage.applies(request))
+
+    def first_stage(self, request_type, route):
+        return self.first.get((request_type, route)) if pd.notna(route) else None
+
+    def stage(self, request):
+        stages = self.stages.get(request['request_type'], [])
+        position = request.get('stage')
+        return stages[int(position)] if pd.notna(position) and int(position) < len(stages) else None
+
+    def transition(self, request, action):
+        request_type, route, position = request['request_type'], request.get('route'), request.get('stage')
+        if action == 'Pending':
+            return 'Pending', self.first_stage(request_type, route)
+        if pd.isna(route) or pd.isna(position):
+            return action, None
+        return self.table.get((request_type, int(route), int(position), action), (action, None))
+
+class AutoApprovalRule:
+    ACTIONS = ['approve', 'route']
+
+    def __init__(self, name, action='approve', types=None, roles=None, keywords=None, exclude_keywords=None,
+                 min_approval_rate=None, min_decisions=1, assignee=None, priority=None):
+        if action not in self.ACTIONS:
+            raise ApprovalError(f"Unknown action for auto-approval rule '{name}': {action}")
+        self.name = name
+        self.action = action
+        self.types = types
+        self.roles = roles
+        self.keywords = self._pattern(keywords)
+        self.exclude_keywords = self._pattern(exclude_keywords)
+        self.min_approval_rate = min_approval_rate
+        self.min_decisions = min_decisions
+        self.assignee = assignee
+        self.priority = priority
+
+    @staticmethod
+    def _pattern(keywords):
+        return '|'.join(re.escape(keyword.lower()) for keyword in keywords) if keywords else None
+
+    @property
+    def uses_text(self):
+        return self.keywords is not None or self.exclude_keywords is not None
+
+    def mask(self, requests_df, text, roles, approval_rates, decisions):
+        mask = pd.Series(True, index=requests_df.index)
+        if self.types is not None:
+            mask &= requests_df['request_type'].isin(self.types)
+        if self.roles is not None:
+            mask &= roles.isin(self.roles)
+        if self.keywords is not None:
+            mask &= text.str.contains(self.keywords, regex=True)
+        if self.exclude_keywords is not None:
+            mask &= ~text.str.contains(self.exclude_keywords, regex=True)
+        if self.min_approval_rate is not None:
+            mask &= approval_rates.ge(self.min_approval_rate) & decisions.ge(self.min_decisions)
+        return mask
+
+class AutoApprovalRules:
+    def __init__(self, rules=None):
+        self.rules = [AutoApprovalRule(**rule) for rule in (AUTO_APPROVAL_RULES if rules is None else rules)]
+
+    @staticmethod
+    def _text(requests_df):
+        try:
+            import pyarrow
+            dtype = 'string[pyarrow]'
+        except ImportError:
+            dtype = 'string'
+        return (requests_df['title'].astype(dtype).fillna('') + ' ' + requests_df['description'].astype(dtype).fillna('')).str.lower()
+
+    def evaluate(self, requests_df, roles, approval_rates, decisions):
+        text = self._text(requests_df) if any(rule.uses_text for rule in self.rules) else None
+        matched = pd.Series(-1, index=requests_df.index)
+        for position in reversed(range(len(self.rules))):
+            matched = matched.mask(self.rules[position].mask(requests_df, text, roles, approval_rates, decisions), position)
+        return matched
+
+class TimerWheel:
+    def __init__(self, resolution=1.0, slots=1024):
+        self.resolution = resolution
+        self.slots = [{} for _ in range(slots)]
+        self.tick = None
+
+    def _slot(self, deadline):
+        return self.slots[int(deadline // self.resolution) % len(self.slots)]
+
+    def schedule(self, key, deadline):
+        self._slot(deadline)[key] = deadline
+
+    def advance(self, now):
+        now_tick = int(now // self.resolution)
+        start = now_tick - len(self.slots) + 1 if self.tick is None else max(self.tick, now_tick - len(self.slots) + 1)
+        expired = []
+        for tick in range(start, now_tick + 1):
+            slot = self.slots[tick % len(self.slots)]
+            for key in [key for key, deadline in slot.items() if deadline <= now]:
+                del slot[key]
+                expired.append(key)
+        self.tick = now_tick
+        return expired
+
+class LeaseTable:
+    def __init__(self):
+        self.leases = {}
+        self.wheel = TimerWheel()
+        self.log_rows = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, leases_df):
+        table = cls()
+        table.log_rows = len(leases_df)
+        latest = leases_df.drop_duplicates('request_id', keep='last')
+        latest = latest[(latest['action'] == 'Claimed') & (latest['expires_at'] > pd.Timestamp.now())]
+        for request_id, user, expires_at in zip(latest['request_id'], latest['user'], latest['expires_at']):
+            table.leases[request_id] = (user, expires_at)
+            table.wheel.schedule(request_id, expires_at.timestamp())
+        return table
+
+    def active(self, now=None):
+        now = now or pd.Timestamp.now()
+        with self._lock:
+            for request_id in self.wheel.advance(now.timestamp()):
+                self.leases.pop(request_id, None)
+            return {request_id: lease for request_id, lease in self.leases.items() if lease[1] > now}
 
-        return f"{request_type}{month_char}{increment_str}{0}"
+class RequestManager:
+    LEASE_MINUTES = 10
+    MAX_LEASE_MINUTES = 120
+    LEASE_LOG_SLACK = 100
+    INDEX_BUILDERS = {'search': SearchIndex.build, 'id': RequestIdIndex.build, 'filter': RequestFilterIndex.build, 'priority': RequestPriorityIndex.build}
+    CATCH_UP_LIMIT = 50_000
 
-    def create_request(self, user, request_type, title, description):
-        requests_df = self.data_manager.load_requests()
-        new_id = self.generate_request_id(request_type)
-        new_request = pd.DataFrame([{'id': new_id, 'user': user, 'request_type': request_type, 'title': title, 'description': description, 'status': 'Pending', 'approver_comment': None}])
-        updated_requests = pd.concat([requests_df, new_request], ignore_index=True)
-        self.data_manager.save_requests(updated_requests)
-        self.log_request_history(new_id, 'Created', user, {'request_type': request_type, 'title': title, 'description': description})
-        st.success(f"Request submitted successfully with ID: {new_id}!")
-
-    def update_request_status(self, request_id, new_status, user, comment=None):
+    def __init__(self, data_manager, assignment=None, workflow=None, auto_rules=None):
+        self.data_manager = data_manager
+        if assignment is None and ASSIGNMENT_STRATEGY not in ASSIGNMENT_STRATEGIES:
+            raise ValueError(f"Unknown assignment strategy: {ASSIGNMENT_STRATEGY}")
+        self.assignment = assignment or ASSIGNMENT_STRATEGIES[ASSIGNMENT_STRATEGY]()
+        self.workflow = workflow or ApprovalWorkflow()
+        self.auto_rules = auto_rules or AutoApprovalRules()
+
+    def _cached_indexes(self, path):
+        return {kind: _request_indexes.get((path, kind)) for kind in self.INDEX_BUILDERS}
+
+    def _indexes(self):
+        path = os.path.abspath(self.data_manager.requests_file)
+        generation = self.data_manager.request_generation()
+        cached = self._cached_indexes(path)
+        if all(entry is not None and entry[0] == generation for entry in cached.values()):
+            return {kind: entry[1] for kind, entry in cached.items()}
+        history_rows = self.data_manager.request_history_rows()
         requests_df = self.data_manager.load_requests()
-        original_request = requests_df[requests_df['id'] == request_id].iloc[0].to_dict()
-        requests_df.loc[requests_df['id'] == request_id, 'status'] = new_status
-        requests_df.loc[requests_df['id'] == request_id, 'approver_comment'] = comment
-        self.data_manager.save_requests(requests_df)
-        self.log_request_history(request_id, new_status, user, {'comment': comment} if comment else {})
-        st.success(f"Request {request_id} updated to {new_status}")
+        with _index_lock:
+            indexes = self._catch_up(path, generation, history_rows, requests_df)
+        if indexes is None:
+            indexes = {kind: build(requests_df) for kind, build in self.INDEX_BUILDERS.items()}
+            with _index_lock:
+                for kind, index in indexes.items():
+                    _request_indexes[(path, kind)] = (generation, index, history_rows)
+        return indexes
+
+    def _catch_up(self, path, generation, history_rows, requests_df):
+        cached = self._cached_indexes(path)
+        if any(entry is None for entry in cached.values()) or len({entry[2] for entry in cached.values()}) != 1:
+            return None
+        indexes = {kind: entry[1] for kind, entry in cached.items()}
+        cached_generation, _, since = next(iter(cached.values()))
+        if all(entry[0] == cached_generation for entry in cached.values()) and all(map(operator.ge, cached_generation, generation)):
+            return indexes
+        if since > history_rows:
+            return None
+        touched = self.data_manager.load_request_history(since)['request_id'].iloc[:history_rows - since].dropna().unique()
+        if len(touched) > self.CATCH_UP_LIMIT:
+            return None
+        live = requests_df[requests_df['id'].isin(touched)]
+        for request_id in touched:
+            indexes['search'].remove(request_id)
+            indexes['id'].remove(request_id)
+            indexes['filter'].remove(request_id)
+            indexes['priority'].remove(request_id)
+        for request in live.to_dict('records'):
+            indexes['search'].add(request['id'], request)
+            indexes['id'].add(request['id'])
+            indexes['filter'].add(request['id'], request)
+            indexes['priority'].add(request['id'], request)
+        if len(indexes['id'].ids) != len(requests_df):
+            for kind in indexes:
+                _request_indexes.pop((path, kind), None)
+            return None
+        for kind, index in indexes.items():
+            _request_indexes[(path, kind)] = (generation, index, history_rows)
+        return indexes
+
+    def _commit_indexes(self, indexes):
+        path = os.path.abspath(self.data_manager.requests_file)
+        generation = self.data_manager.request_generation()
+        history_rows = self.data_manager.request_history_rows()
+        for kind, index in indexes.items():
+            _request_indexes[(path, kind)] = (generation, index, history_rows)
+
+    def _counters(self):
+        counters = RequestCounters(self.data_manager.load_counters())
+        generation = self.data_manager.request_generation()
+        if counters.generation != generation or counters.ids is None or counters.assignee is None or counters.auto is None:
+            counters = RequestCounters.build(self.data_manager.load_requests(), self.data_manager.load_request_history(), self.data_manager.load_deleted_requests())
+            counters.generation = generation
+            self.data_manager.save_counters(counters.to_dict())
+        return counters
+
+    def _commit_counters(self, counters):
+        counters.generation = self.data_manager.request_generation()
+        self.data_manager.save_counters(counters.to_dict())
+
+    def get_counters(self):
+        return self._counters()
+
+    def get_analytics(self):
+        path = os.path.abspath(self.data_manager.request_history_file)
+        analytics = _history_analytics.get(path)
+        if analytics is None:
+            analytics = _history_analytics.setdefault(path, ApprovalAnalytics())
+        return analytics.sync(self.data_manager.load_request_history)
+
+    def get_dashboard_metrics(self, user):
+        counters = self._counters()
+        today = counters.day.get(datetime.now().strftime('%Y-%m-%d'), Counter())
+        return {
+            'pending': counters.status['Pending'],
+            'my_open': counters.open_count(user),
+            'assigned_to_me': counters.assignee.get(user, Counter())['Pending'],
+            'approved_today': today['Approved'],
+            'created_today': today['Created'],
+        }
+
+    @property
+    def search_index(self):
+        return self._indexes()['search']
+
+    @property
+    def id_index(self):
+        return self._indexes()['id']
+
+    def lookup_request_ids(self, prefix, limit=50):
+        return self.id_index.lookup(prefix, limit)
+
+    @property
+    def filter_index(self):
+        return self._indexes()['filter']
+
+    @property
+    def priority_index(self):
+        return self._indexes()['priority']
+
+    @property
+    def requests(self):
+        return RequestQuery(self)
+
+    def where(self, **predicates):
+        return self.requests.where(**predicates)
+
+    def page(self, after_id=None, limit=50, order_by='id'):
+        return self.requests.page(after_id, limit, order_by)
+
+    def search_requests(self, query, limit=20):
+        matches = self.search_index.search(query, limit)
+        requests_df = self.data_manager.load_indexed('requests', 'id')
+        ranked_ids = [request_id for request_id, score in matches]
+        return requests_df.loc[ranked_ids].reset_index(drop=True)
+
+    def _derived(self, uow):
+        if 'derived' not in uow.context:
+            indexes = self._indexes()
+            counters = self._counters()
+            updates = []
+            uow.context['derived'] = (indexes, counters, updates)
+
+            def apply_updates():
+                with _index_lock:
+                    for pending_update in updates:
+                        pending_update(indexes, counters)
+                self._commit_indexes(indexes)
+                self._commit_counters(counters)
+
+            uow.on_commit(apply_updates)
+        return uow.context['derived']
+
+    def _on_commit(self, uow, update):
+        self._derived(uow)[2].append(update)
+
+    def _role(self, username):
+        users_df = self.data_manager.load_indexed('users', 'username')
+        return users_df.at[username, 'role'] if username in users_df.index else None
+
+    def _stage_approvers(self, stage):
+        if stage is None or not stage.restricted:
+            return None
+        return [approver for approver in self.data_manager.load_approvers() if stage.allows(approver, self._role(approver))]
+
+    def _assign(self, uow, request_type, approvers=None):
+        approvers = self.data_manager.load_approvers() if approvers is None else approvers
+        if not approvers:
+            return None
+        counters = self._derived(uow)[1]
+        staged = uow.context.setdefault('assigned', Counter())
+        loads = {approver: counters.assignee.get(approver, Counter())['Pending'] + staged[approver] for approver in approvers}
+        assigned = sum(sum(counts.values()) for counts in counters.assignee.values()) + sum(staged.values())
+        assignee = self.assignment.choose(request_type, approvers, loads, assigned)
+        staged[assignee] += 1
+        return assignee
+
+    def _rule_inputs(self, requests_df, counters=None):
+        counters = counters or self._counters()
+        users_df = self.data_manager.load_users().drop_duplicates('username', keep='last')
+        roles = requests_df['user'].map(pd.Series(users_df['role'].astype(object).values, index=users_df['username']))
+        stats = pd.DataFrame([(user, *counters.human_decisions(user)) for user in counters.user],
+                             columns=['user', 'approved', 'decisions']).set_index('user')
+        approved = requests_df['user'].map(stats['approved']).fillna(0)
+        decisions = requests_df['user'].map(stats['decisions']).fillna(0)
+        return roles, approved / decisions.where(decisions > 0), decisions
+
+    def _auto_rule(self, request, counters):
+        if not self.auto_rules.rules:
+            return None
+        approved, decisions = counters.human_decisions(request['user'])
+        matched = self.auto_rules.evaluate(pd.DataFrame([request]), pd.Series([self._role(request['user'])]),
+                                           pd.Series([approved / decisions if decisions else float('nan')]), pd.Series([decisions]))
+        return self.auto_rules.rules[matched.iloc[0]] if matched.iloc[0] >= 0 else None
+
+    def apply_auto_rules(self, dry_run=False):
+        rules = self.auto_rules.rules
+        if not rules:
+            return Counter()
+        with self.data_manager.transaction() as uow:
+            requests_df = uow.load('requests')
+            pending = requests_df[(requests_df['status'] == 'Pending') & ~requests_df['id'].isin(self.data_manager.load_tombstones().index)]
+            matched = self.auto_rules.evaluate(pending, *self._rule_inputs(pending))
+            changed = []
+            for position, rows in matched[matched >= 0].groupby(matched[matched >= 0]).groups.items():
+                rule = rules[position]
+                if rule.action == 'route':
+                    unchanged = pd.Series(True, index=rows)
+                    if rule.assignee is not None:
+                        unchanged &= requests_df.loc[rows, 'assignee'].eq(rule.assignee).fillna(False)
+                    if rule.priority is not None:
+                        unchanged &= requests_df.loc[rows, 'priority'].eq(int(rule.priority)).fillna(False)
+                    rows = rows[~unchanged.to_numpy()]
+                changed.append((rule, rows))
+            applied = Counter({rule.name: len(rows) for rule, rows in changed if len(rows)})
+            if dry_run or not applied:
+                return applied
+            for rule, rows in changed:
+                if rule.action == 'approve':
+                    requests_df.loc[rows, 'status'] = 'Approved'
+                    requests_df.loc[rows, 'approver_comment'] = f"{AUTO_APPROVAL_COMMENT} '{rule.name}'"
+                    requests_df.loc[rows, 'stage'] = pd.NA
+                    requests_df.loc[rows, 'decided_by'] = AUTO_APPROVER
+                else:
+                    if rule.assignee is not None:
+                        requests_df.loc[rows, 'assignee'] = rule.assignee
+                    if rule.priority is not None:
+                        requests_df.loc[rows, 'priority'] = int(rule.priority)
+                requests_df.loc[rows, 'version'] = requests_df.loc[rows, 'version'].fillna(0) + 1
+                for request_id in requests_df.loc[rows, 'id']:
+                    uow.log(request_id, 'Approved' if rule.action == 'approve' else 'Routed', AUTO_APPROVER, {'rule': rule.name})
+            uow.stage('requests', requests_df)
+        return applied
+
+    def _id_prefix(self, request_type, now=None):
+        now = now or datetime.now()
+        month_char_map = {
+            1: '1', 2: '2', 3: '3', 4: '4', 5: '5', 6: '6', 7: '7', 8: '8', 9: '9',
+            10: 'A', 11: 'B', 12: 'C'
+        }
+        return f"{request_type}{month_char_map[now.month]}"
+
+    def generate_request_id(self, request_type, counters=None):
+        prefix = self._id_prefix(request_type)
+
+        if counters is None:
+            counters = self._counters()
+        increment = counters.next_id(prefix)
+
+        return f"{prefix}{RequestCounters.format_increment(increment)}"
+
+    def create_request(self, user, request_type, title, description, priority=None):
+        if request_type not in REQUEST_TYPES:
+            raise ApprovalError(f"Unknown request type: {request_type}")
+        priority = int(priority) if priority is not None else None
+        with self.data_manager.transaction() as uow:
+            requests_df = uow.load('requests')
+            new_id = self.generate_request_id(request_type, self._derived(uow)[1])
+            new_request = {'id': new_id, 'user': user, 'request_type': request_type, 'title': title, 'description': description, 'status': 'Pending', 'approver_comment': None, 'created_at': datetime.now(), 'version': 1, 'priority': priority}
+            rule = self._auto_rule(new_request, self._derived(uow)[1])
+            if rule is not None and rule.action == 'approve':
+                new_request.update({'status': 'Approved', 'approver_comment': f"{AUTO_APPROVAL_COMMENT} '{rule.name}'", 'route': None, 'stage': None, 'assignee': None, 'decided_by': AUTO_APPROVER})
+            else:
+                if rule is not None and rule.priority is not None:
+                    new_request['priority'] = int(rule.priority)
+                new_request['route'] = self.workflow.route(new_request)
+                new_request['stage'] = self.workflow.first_stage(request_type, new_request['route'])
+                if rule is not None and rule.assignee is not None:
+                    new_request['assignee'] = rule.assignee
+                else:
+                    new_request['assignee'] = self._assign(uow, request_type, self._stage_approvers(self.workflow.stage(new_request)))
+            assignee = new_request['assignee']
+            uow.stage('requests', pd.concat([requests_df, pd.DataFrame([new_request]).astype({'priority': 'Int64', 'stage': 'Int64', 'route': 'Int64'})], ignore_index=True))
+            uow.log(new_id, 'Created', user, {'request_type': request_type, 'title': title, 'description': description})
+            if rule is not None:
+                uow.log(new_id, 'Approved' if rule.action == 'approve' else 'Routed', AUTO_APPROVER, {'rule': rule.name})
+            day = datetime.now().strftime('%Y-%m-%d')
+
+            def update(indexes, counters):
+                indexes['search'].add(new_id, new_request)
+                indexes['id'].add(new_id)
+                indexes['filter'].add(new_id, new_request)
+                indexes['priority'].add(new_id, new_request)
+                counters.record_created(user, request_type, day, assignee)
+                if new_request['status'] == 'Approved':
+                    counters.record_status_change(user, 'Pending', 'Approved', day)
+                    counters.record_auto_approved(user)
+
+            self._on_commit(uow, update)
+        return new_id
+
+    def import_requests(self, requests_df):
+        request_types = requests_df['request_type'].astype(object).reset_index(drop=True)
+        unknown = sorted(set(request_types.fillna('')) - set(REQUEST_TYPES))
+        if unknown:
+            raise ApprovalError(f"Unknown request type(s): {', '.join(map(str, unknown))}")
+        if requests_df['user'].isna().any() or requests_df['title'].isna().any():
+            raise ApprovalError("Every imported request needs a user and a title.")
+        created_at = datetime.now()
+        day = created_at.strftime('%Y-%m-%d')
+        with self.data_manager.transaction() as uow:
+            requests_df = requests_df.reset_index(drop=True)
+            counters = self._derived(uow)[1]
+            ids = pd.Series(index=request_types.index, dtype=object)
+            for request_type, positions in request_types.groupby(request_types).groups.items():
+                prefix = self._id_prefix(request_type, created_at)
+                ids[positions] = [f"{prefix}{RequestCounters.format_increment(increment)}" for increment in counters.reserve_ids(prefix, len(positions))]
+            imported = pd.DataFrame({
+                'id': ids, 'user': requests_df['user'].astype(str), 'request_type': pd.Categorical(request_types, categories=REQUEST_TYPES),
+                'title': requests_df['title'].astype(str), 'description': requests_df['description'] if 'description' in requests_df else '',
+                'status': pd.Categorical(['Pending'] * len(requests_df), categories=REQUEST_STATUSES), 'approver_comment': None,
+                'created_at': created_at, 'version': 1, 'priority': requests_df['priority'] if 'priority' in requests_df else pd.NA,
+                'assignee': None, 'stage': pd.NA, 'route': pd.NA, 'decided_by': None,
+            }).astype({'version': 'Int64', 'priority': 'Int64', 'stage': 'Int64', 'route': 'Int64'})
+
+            matched = self.auto_rules.evaluate(imported, *self._rule_inputs(imported, counters)) if self.auto_rules.rules else pd.Series(-1, index=imported.index)
+            for position, rows in matched[matched >= 0].groupby(matched[matched >= 0]).groups.items():
+                rule = self.auto_rules.rules[position]
+                if rule.action == 'approve':
+                    imported.loc[rows, 'status'] = 'Approved'
+                    imported.loc[rows, 'approver_comment'] = f"{AUTO_APPROVAL_COMMENT} '{rule.name}'"
+                    imported.loc[rows, 'decided_by'] = AUTO_APPROVER
+                else:
+                    if rule.assignee is not None:
+                        imported.loc[rows, 'assignee'] = rule.assignee
+                    if rule.priority is not None:
+                        imported.loc[rows, 'priority'] = int(rule.priority)
+
+            records = imported.to_dict('records')
+            stage_approvers = {}
+            for request in records:
+                if request['status'] != 'Pending':
+                    continue
+                request['route'] = self.workflow.route(request)
+                request['stage'] = self.workflow.first_stage(request['request_type'], request['route'])
+                if pd.isna(request['assignee']):
+                    key = (request['request_type'], request['stage'])
+                    if key not in stage_approvers:
+                        approvers = self._stage_approvers(self.workflow.stage(request))
+                        stage_approvers[key] = self.data_manager.load_approvers() if approvers is None else approvers
+                    request['assignee'] = self._assign(uow, request['request_type'], stage_approvers[key])
+            for column in ('route', 'stage'):
+                imported[column] = pd.array([request[column] for request in records], dtype='Int64')
+            imported['assignee'] = [request['assignee'] for request in records]
+
+            uow.stage('requests', self.data_manager._concat_rows('requests', uow.load('requests'), imported))
+            for request in records:
+                uow.log(request['id'], 'Created', request['user'], {'request_type': request['request_type'], 'title': request['title'], 'description': request['description']})
+            for row, position in matched[matched >= 0].items():
+                rule = self.auto_rules.rules[position]
+                uow.log(records[row]['id'], 'Approved' if rule.action == 'approve' else 'Routed', AUTO_APPROVER, {'rule': rule.name})
+
+            def update(indexes, counters):
+                indexes['id'].add_many(imported['id'])
+                indexes['filter'].add_many(imported)
+                indexes['priority'].add_many(imported)
+                for request in records:
+                    indexes['search'].add(request['id'], request)
+                    counters.record_created(request['user'], request['request_type'], day, request['assignee'])
+                    if request['status'] == 'Approved':
+                        counters.record_status_change(request['user'], 'Pending', 'Approved', day)
+                        counters.record_auto_approved(request['user'])
+
+            self._on_commit(uow, update)
+        return imported
+
+    def _set_status(self, uow, request_id, new_status, user, comment=None, expected_version=None):
+        if user == AUTO_APPROVER:
+            raise ApprovalError(f"The username '{AUTO_APPROVER}' is reserved for auto-approval rules.")
+        requests_df = uow.load('requests')
+        mask = requests_df['id'] == request_id
+        if not mask.any() or request_id in self.data_manager.load_tombstones().index:
+            raise RequestNotFoundError(f"Request {request_id} not found.")
+        original_request = requests_df[mask].iloc[0].to_dict()
+        self._release_on_decision(uow, request_id, user)
+        version = int(original_request['version']) if pd.notna(original_request['version']) else 0
+        if expected_version is not None and (int(expected_version) if pd.notna(expected_version) else 0) != version:
+            raise VersionConflictError(f"Request {request_id} was changed by someone else (version {version}, expected {expected_version}).")
+        if new_status != 'Pending' and original_request['status'] != 'Pending':
+            raise VersionConflictError(f"Request {request_id} is already {original_request['status']}.")
+        if new_status == 'Pending' and original_request['status'] != 'Returned':
+            raise VersionConflictError(f"Request {request_id} is {original_request['status']}; only returned requests can be resubmitted.")
+        if new_status == 'Pending' and user != original_request['user']:
+            raise ApprovalError(f"Only {original_request['user']} can resubmit request {request_id}.")
+        stage = self.workflow.stage(original_request)
+        if stage is not None and new_status != 'Pending' and not stage.allows(user, self._role(user)):
+            raise ApprovalError(f"User '{user}' cannot review the {stage.name} stage of request {request_id}.")
+        status, next_position = self.workflow.transition(original_request, new_status)
+        assignee = original_request['assignee']
+        if status == 'Pending' and next_position is not None:
+            next_stage = self.workflow.stages[original_request['request_type']][next_position]
+            approvers = self._stage_approvers(next_stage)
+            if approvers is not None and assignee not in approvers:
+                assignee = self._assign(uow, original_request['request_type'], approvers)
+        changes = {'status': status, 'approver_comment': comment, 'version': version + 1, 'stage': next_position, 'assignee': assignee, 'decided_by': user if status != 'Pending' else None}
+        for column, value in changes.items():
+            requests_df.loc[mask, column] = value
+        original_request['version'] = version
+        uow.stage('requests', requests_df)
+        details = {'comment': comment} if comment else {}
+        if stage is not None and new_status != 'Pending':
+            details['stage'] = stage.name
+        if new_status == 'Approved' and status == 'Pending':
+            uow.log(request_id, 'Advanced', user, {**details, 'next_stage': next_stage.name})
+        else:
+            uow.log(request_id, status, user, details)
+        day = datetime.now().strftime('%Y-%m-%d')
+
+        def update(indexes, counters):
+            updated_request = {**original_request, **changes}
+            indexes['search'].add(request_id, updated_request)
+            indexes['filter'].add(request_id, updated_request)
+            indexes['priority'].add(request_id, updated_request)
+            if status != original_request['status']:
+                counters.record_status_change(original_request['user'], original_request['status'], status, day, original_request['assignee'], RequestCounters.auto_approved(original_request))
+            if assignee != original_request['assignee']:
+                counters.record_reassigned(original_request['assignee'], assignee, status)
+
+        self._on_commit(uow, update)
+        return original_request, changes
+
+    def active_claims(self):
+        return self.data_manager.load_leases().active()
+
+    def get_review_queue(self, user):
+        claimed_by_others = [request_id for request_id, (holder, expires_at) in self.active_claims().items() if holder != user]
+        return self.requests.where(status='Pending').excluding(claimed_by_others).excluding(self._stages_closed_to(user))
+
+    def _stages_closed_to(self, user):
+        role = self._role(user)
+        closed = [(request_type, position) for request_type, stages in self.workflow.stages.items()
+                  for position, stage in enumerate(stages) if not stage.allows(user, role)]
+        return set().union(*(self.where(status='Pending', type=request_type, stage=position).ids() for request_type, position in closed))
+
+    def _holder(self, request_id, user):
+        holder = self.active_claims().get(request_id)
+        if holder and holder[0] != user:
+            raise ClaimConflictError(f"Request {request_id} is claimed by {holder[0]} until {holder[1]:%H:%M}.")
+        return holder
+
+    def _write_lease(self, uow, request_id, user, action, expires_at):
+        leases = self.data_manager.load_leases()
+        active = leases.active()
+        row = {'request_id': request_id, 'user': user, 'action': action, 'expires_at': expires_at}
+        if leases.log_rows > 2 * len(active) + self.LEASE_LOG_SLACK:
+            rows = [{'request_id': leased_id, 'user': holder, 'action': 'Claimed', 'expires_at': leased_until}
+                    for leased_id, (holder, leased_until) in active.items() if leased_id != request_id]
+            uow.stage('request_leases', pd.DataFrame(rows + [row], columns=list(TABLE_SCHEMAS['request_leases'])))
+        else:
+            uow.append('request_leases', row)
+
+    def _release_on_decision(self, uow, request_id, user):
+        if self._holder(request_id, user):
+            self._write_lease(uow, request_id, user, 'Released', pd.Timestamp.now())
+
+    def claim_request(self, request_id, user, minutes=None):
+        minutes = self.LEASE_MINUTES if minutes is None else minutes
+        if not isinstance(minutes, int) or isinstance(minutes, bool) or not 0 < minutes <= self.MAX_LEASE_MINUTES:
+            raise ApprovalError(f"Claims last a whole number of minutes from 1 to {self.MAX_LEASE_MINUTES}.")
+        with self.data_manager.transaction() as uow:
+            request = self.get_request_by_id(request_id)
+            if request['status'] != 'Pending':
+                raise ApprovalError(f"Request {request_id} is not pending.")
+            stage = self.workflow.stage(request)
+            if stage is not None and not stage.allows(user, self._role(user)):
+                raise ApprovalError(f"User '{user}' cannot review the {stage.name} stage of request {request_id}.")
+            self._holder(request_id, user)
+            expires_at = pd.Timestamp.now() + pd.Timedelta(minutes=minutes)
+            self._write_lease(uow, request_id, user, 'Claimed', expires_at)
+        return expires_at
+
+    def release_claim(self, request_id, user):
+        with self.data_manager.transaction() as uow:
+            if not self._holder(request_id, user):
+                return False
+            self._write_lease(uow, request_id, user, 'Released', pd.Timestamp.now())
+        return True
+
+    def update_request_status(self, request_id, new_status, user, comment=None, expected_version=None):
+        if new_status not in REQUEST_STATUSES:
+            raise ApprovalError(f"Unknown request status: {new_status}")
+        if new_status == 'Pending':
+            raise ApprovalError("Requests return to Pending only by resubmission.")
+        with self.data_manager.transaction() as uow:
+            original_request, changes = self._set_status(uow, request_id, new_status, user, comment, expected_version)
+        return {**original_request, **changes}
+
+    def resubmit_request(self, request_id, user, new_description, expected_version=None):
+        with self.data_manager.transaction() as uow:
+            original_request, changes = self._set_status(uow, request_id, 'Pending', user, None, expected_version)
+            requests_df = uow.load('requests')
+            requests_df.loc[requests_df['id'] == request_id, 'description'] = new_description
+            uow.stage('requests', requests_df)
+            uow.log(request_id, 'Edited', user, {'old_details': {'description': original_request['description']}, 'new_details': {'description': new_description}})
+            uow.log(request_id, 'Resubmitted', user, {})
+
+            def update(indexes, counters):
+                indexes['search'].add(request_id, {**original_request, **changes, 'description': new_description})
+
+            self._on_commit(uow, update)
+        return {**original_request, **changes, 'description': new_description}
+
+    def delete_request(self, request_id, user):
+        with self.data_manager.transaction() as uow:
+            requests_df = self.data_manager.load_indexed('requests', 'id')
+            if request_id not in requests_df.index or request_id in self.data_manager.load_tombstones().index:
+                raise RequestNotFoundError(f"Request {request_id} not found.")
+            deleted_request = requests_df.loc[[request_id]].iloc[0].to_dict()
+            deleted_at = datetime.now()
+            uow.append('request_tombstones', {'request_id': request_id, 'action': 'Deleted', 'user': user, 'timestamp': deleted_at})
+            uow.log(request_id, 'Deleted', user, {})
+            day = deleted_at.strftime('%Y-%m-%d')
+
+            def update(indexes, counters):
+                indexes['search'].remove(request_id)
+                indexes['id'].remove(request_id)
+                indexes['filter'].remove(request_id)
+                indexes['priority'].remove(request_id)
+                counters.record_deleted(deleted_request['user'], deleted_request['request_type'], deleted_request['status'], day, deleted_request['assignee'], RequestCounters.auto_approved(deleted_request))
+
+            self._on_commit(uow, update)
+        return {**deleted_request, 'deleted_by': user, 'deleted_at': deleted_at}
+
+    def restore_request(self, request_id, user):
+        with self.data_manager.transaction() as uow:
+            if request_id not in self.data_manager.load_tombstones().index:
+                raise RequestNotFoundError(f"Request {request_id} is not deleted.")
+            restored_request = self.data_manager.load_indexed('requests', 'id').loc[[request_id]].iloc[0].to_dict()
+            restored_at = datetime.now()
+            uow.append('request_tombstones', {'request_id': request_id, 'action': 'Restored', 'user': user, 'timestamp': restored_at})
+            uow.log(request_id, 'Restored', user, {})
+            day = restored_at.strftime('%Y-%m-%d')
+
+            def update(indexes, counters):
+                indexes['search'].add(request_id, restored_request)
+                indexes['id'].add(request_id)
+                indexes['filter'].add(request_id, restored_request)
+                indexes['priority'].add(request_id, restored_request)
+                counters.record_restored(restored_request['user'], restored_request['request_type'], restored_request['status'], day, restored_request['assignee'], RequestCounters.auto_approved(restored_request))
+
+            self._on_commit(uow, update)
+        return restored_request
+
+    def compact_deleted_requests(self):
+        with self.data_manager.transaction() as uow:
+            tombstones = self.data_manager.load_tombstones()
+            if tombstones.empty:
+                return 0
+            requests_df = uow.load('requests')
+            deleted_mask = requests_df['id'].isin(tombstones.index)
+            archived = requests_df[deleted_mask].reset_index(drop=True)
+            deleted_by = tombstones.reindex(archived['id'])
+            archived['deleted_by'] = deleted_by['user'].values
+            archived['deleted_at'] = deleted_by['timestamp'].values
+            uow.stage('deleted_requests', self.data_manager._concat_rows('deleted_requests', uow.load('deleted_requests'), archived[list(TABLE_SCHEMAS['deleted_requests'])]))
+            uow.stage('requests', requests_df[~deleted_mask])
+            uow.stage('request_tombstones', uow.load('request_tombstones').iloc[0:0])
+            self._on_commit(uow, lambda indexes, counters: None)
+        return len(archived)
+
+    def purge_deleted_requests(self, before):
+        with self.data_manager.transaction() as uow:
+            deleted_requests_df = uow.load('deleted_requests')
+            expired = deleted_requests_df['deleted_at'] < pd.Timestamp(before)
+            if expired.any():
+                uow.stage('deleted_requests', deleted_requests_df[~expired])
+        return int(expired.sum())
+
+    def rebuild_indexes(self):
+        path = os.path.abspath(self.data_manager.requests_file)
+        with self.data_manager.lock():
+            self.data_manager._publish_change('requests')
+            for kind in self.INDEX_BUILDERS:
+                _request_indexes.pop((path, kind), None)
+            return self._indexes()
+
+    def rebuild_counters(self):
+        with self.data_manager.lock():
+            self.data_manager.save_counters({})
+            return self._counters()
 
     def log_request_history(self, request_id, action, user, details=None):
-        history_df = self.data_manager.load_request_history()
-        new_history = pd.DataFrame([{'request_id': request_id, 'timestamp': datetime.now(), 'action': action, 'user': user, 'details': details}])
-        updated_history = pd.concat([history_df, new_history], ignore_index=True)
-        self.data_manager.save_request_history(updated_history)
+        with self.data_manager.transaction() as uow:
+            uow.log(request_id, action, user, details)
 
     def get_user_requests(self, user):
-        requests_df = self.data_manager.load_requests()
-        return requests_df[requests_df['user'] == user]
+        return self.requests.where(user=user).to_frame()
 
     def get_pending_requests(self):
-        requests_df = self.data_manager.load_requests()
-        return requests_df[requests_df['status'] == 'Pending']
+        return self.requests.where(status='Pending').to_frame()
 
     def get_approved_requests(self):
-        requests_df = self.data_manager.load_requests()
-        return requests_df[requests_df['status'] == 'Approved']
+        return self.requests.where(status='Approved').to_frame()
 
     def get_denied_requests(self):
-        requests_df = self.data_manager.load_requests()
-        return requests_df[requests_df['status'] == 'Denied']
+        return self.requests.where(status='Denied').to_frame()
 
     def get_returned_requests(self):
-        requests_df = self.data_manager.load_requests()
-        return requests_df[requests_df['status'] == 'Returned']
+        return self.requests.where(status='Returned').to_frame()
 
     def get_request_by_id(self, request_id):
-        requests_df = self.data_manager.load_requests()
-        return requests_df[requests_df['id'] == request_id].iloc[0]
+        requests_df = self.data_manager.load_indexed('requests', 'id')
+        if request_id not in requests_df.index or request_id in self.data_manager.load_tombstones().index:
+            raise RequestNotFoundError(f"Request {request_id} not found.")
+        return requests_df.loc[[request_id]].iloc[0]
+
+    def get_request_history(self, request_id):
+        history_df = self.data_manager.load_request_history()
+        return history_df[history_df['request_id'] == request_id].reset_index(drop=True)
 
 class UserManager:
     def __init__(self, data_manager):
         self.data_manager = data_manager
 
+    def _check_username(self, username):
+        if not username:
+            raise ApprovalError("Username cannot be empty.")
+        if username == AUTO_APPROVER:
+            raise ApprovalError(f"The username '{AUTO_APPROVER}' is reserved for auto-approval rules.")
+
     def register_user(self, new_username):
-        users_df = self.data_manager.load_users()
-        pending_registrations_df = self.data_manager.load_pending_registrations()
-        if new_username in pending_registrations_df['username'].values or new_username in users_df['username'].values:
-            st.error("Username already exists or is pending approval.")
-            return False
-        else:
+        self._check_username(new_username)
+        with self.data_manager.lock():
+            users_df = self.data_manager.load_users()
+            pending_registrations_df = self.data_manager.load_pending_registrations()
+            if new_username in pending_registrations_df['username'].values or new_username in users_df['username'].values:
+                raise ApprovalError("Username already exists or is pending approval.")
             new_registration = pd.DataFrame([{'username': new_username, 'requested_role': 'user'}])
             updated_pending_registrations = pd.concat([pending_registrations_df, new_registration], ignore_index=True)
             self.data_manager.save_pending_registrations(updated_pending_registrations)
-            st.success("Registration submitted for admin approval as a regular user.")
-            return True
+        return True
 
-    def initialize_admin(self):
-        users_df = self.data_manager.load_users()
-        if users_df.empty:
-            st.subheader("Initialize First Admin User")
-            admin_username = st.text_input("Enter username for the first admin")
-            if st.button("Initialize Admin"):
-                if admin_username in users_df['username'].values:
-                    st.error("Admin username already exists.")
-                else:
-                    new_admin = pd.DataFrame([{'username': admin_username, 'role': 'admin', 'approved': True}])
-                    updated_users = pd.concat([users_df, new_admin], ignore_index=True)
-                    self.data_manager.save_users(updated_users)
-                    st.success(f"Admin user '{admin_username}' created. Please log in.")
-                    st.session_state['first_admin_initialized'] = True
-                    st.rerun()
-                return True
-        return False
+    def has_users(self):
+        return not self.data_manager.load_users().empty
+
+    def initialize_admin(self, admin_username):
+        self._check_username(admin_username)
+        with self.data_manager.lock():
+            users_df = self.data_manager.load_users()
+            if not users_df.empty:
+                raise ApprovalError("An admin user has already been initialized.")
+            new_admin = pd.DataFrame([{'username': admin_username, 'role': 'admin', 'approved': True}])
+            self.data_manager.save_users(pd.concat([users_df, new_admin], ignore_index=True))
+        return True
 
     def login(self, username):
         users_df = self.data_manager.load_users()
-        if username in users_df['username'].values:
-            user_data = users_df[users_df['username'] == username].iloc[0]
-            if user_data['approved']:
-                st.session_state['logged_in_user'] = username
-                st.session_state['user_role'] = user_data['role']
-                return True
-            else:
-                st.sidebar.error("Your registration is pending admin approval.")
-                return False
-        else:
-            st.sidebar.error("Invalid username")
-            return False
-
-    def logout(self):
-        st.session_state.pop('logged_in_user', None)
-        st.session_state.pop('user_role', None)
-        st.session_state.pop('editing_request_id', None)
-        st.session_state.pop('first_admin_initialized', None)
+        if username not in users_df['username'].values:
+            raise ApprovalError("Invalid username")
+        user_data = users_df[users_df['username'] == username].iloc[0]
+        if not (pd.notna(user_data['approved']) and user_data['approved']):
+            raise ApprovalError("Your registration is pending admin approval.")
+        return user_data['role']
 
     def get_pending_registrations(self):
         return self.data_manager.load_pending_registrations()
 
     def approve_registration(self, username, role):
-        users_df = self.data_manager.load_users()
-        pending_registrations_df = self.data_manager.load_pending_registrations()
-        if username not in users_df['username'].values:
-            new_user = pd.DataFrame([{'username': username, 'role': role, 'approved': True}])
-            updated_users = pd.concat([users_df, new_user], ignore_index=True)
-            self.data_manager.save_users(updated_users)
-            updated_pending_registrations = pending_registrations_df[pending_registrations_df['username'] != username]
-            self.data_manager.save_pending_registrations(updated_pending_registrations)
-            st.success(f"User '{username}' approved as '{role}'.")
-            return True
-        else:
-            st.error(f"User '{username}' already exists.")
-            return False
+        self._check_username(username)
+        if role not in USER_ROLES:
+            raise ApprovalError(f"Unknown role: {role}")
+        with self.data_manager.lock():
+            users_df = self.data_manager.load_users()
+            pending_registrations_df = self.data_manager.load_pending_registrations()
+            if username not in users_df['username'].values:
+                new_user = pd.DataFrame([{'username': username, 'role': role, 'approved': True}])
+                updated_users = pd.concat([users_df, new_user], ignore_index=True)
+                self.data_manager.save_users(updated_users)
+                updated_pending_registrations = pending_registrations_df[pending_registrations_df['username'] != username]
+                self.data_manager.save_pending_registrations(updated_pending_registrations)
+                return True
+            else:
+                raise ApprovalError(f"User '{username}' already exists.")
 
     def reject_registration(self, username):
-        pending_registrations_df = self.data_manager.load_pending_registrations()
-        updated_pending_registrations = pending_registrations_df[pending_registrations_df['username'] != username]
-        self.data_manager.save_pending_registrations(updated_pending_registrations)
-        st.info(f"Registration for '{username}' rejected.")
+        with self.data_manager.lock():
+            pending_registrations_df = self.data_manager.load_pending_registrations()
+            updated_pending_registrations = pending_registrations_df[pending_registrations_df['username'] != username]
+            self.data_manager.save_pending_registrations(updated_pending_registrations)
         return True
 
     def get_all_users(self):
         return self.data_manager.load_users()
 
+    def page(self, after_username=None, limit=50, order_by='username'):
+        columns = [order_by, 'username'] if order_by != 'username' else ['username']
+        users_df, keys = self.data_manager.load_sorted('users', columns)
+        start = 0
+        if after_username is not None:
+            if order_by == 'username':
+                cursor = (str(after_username),)
+            else:
+                indexed_users = self.data_manager.load_indexed('users', 'username')
+                if after_username not in indexed_users.index:
+                    raise ValueError(f"Unknown page cursor: {after_username}")
+                value = indexed_users.at[after_username, order_by]
+                cursor = ('' if pd.isna(value) else str(value), str(after_username))
+            start = bisect.bisect_right(keys, cursor)
+        return users_df.iloc[start:start + limit].reset_index(drop=True)
+
+    def change_user_roles(self, usernames, new_role, chunk_size=100_000, progress=None):
+        if new_role not in USER_ROLES:
+            raise ApprovalError(f"Unknown role: {new_role}")
+        with self.data_manager.transaction() as uow:
+            users_df = uow.load('users')
+            mask = pd.Series(False, index=users_df.index)
+            for start in range(0, len(usernames), chunk_size):
+                chunk = usernames[start:start + chunk_size]
+                mask |= users_df['username'].isin(chunk)
+                if progress is not None:
+                    progress(len(chunk))
+            mask &= users_df['role'] != new_role
+            if mask.any():
+                users_df.loc[mask, 'role'] = new_role
+                uow.stage('users', users_df)
+        return int(mask.sum())
+
     def change_user_role(self, username, new_role):
-        users_df = self.data_manager.load_users()
-        users_df.loc[users_df['username'] == username, 'role'] = new_role
-        self.data_manager.save_users(users_df)
-        st.success(f"Role of '{username}' changed to '{new_role}'.")
+        if new_role not in USER_ROLES:
+            raise ApprovalError(f"Unknown role: {new_role}")
+        with self.data_manager.lock():
+            users_df = self.data_manager.load_users()
+            mask = users_df['username'] == username
+            if not mask.any():
+                raise ApprovalError(f"User '{username}' not found.")
+            users_df.loc[mask, 'role'] = new_role
+            self.data_manager.save_users(users_df)
         return True
 
 class DisplayManager:
+    PAGE_SIZE = 20
+
+    def page_cursor(self, key):
+        return st.session_state.setdefault(f"{key}_cursors", [None])[-1]
+
+    def display_page_controls(self, page_df, column, key):
+        cursors = st.session_state.setdefault(f"{key}_cursors", [None])
+        col1, col2 = st.columns(2)
+        with col1:
+            if len(cursors) > 1 and st.button("Previous page", key=f"{key}_previous"):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            if len(page_df) == self.PAGE_SIZE and st.button("Next page", key=f"{key}_next"):
+                cursors.append(page_df[column].iloc[-1])
+                st.rerun()
+
+    def display_request_page(self, query, title, key):
+        page_df = query.page(self.page_cursor(key), self.PAGE_SIZE)
+        self.display_requests(page_df, title)
+        self.display_page_controls(page_df, 'id', key)
+
     def display_requests(self, df, title):
         st.subheader(title)
         if df.empty:
@@ -232,10 +2103,40 @@ class DisplayManager:
             st.markdown(f"**Title:** {row['title']}")
             st.markdown(f"**Description:** {row['description']}")
             st.markdown(f"**Status:** {row['status']}")
-            if row['approver_comment']:
+            if pd.notna(row['approver_comment']) and row['approver_comment']:
                 st.markdown(f"**Comment:** {row['approver_comment']}")
             st.divider()
 
+    def display_dashboard_metrics(self, metrics):
+        col1, col2, col3, col4, col5 = st.columns(5)
+        col1.metric("Pending", metrics['pending'])
+        col2.metric("Assigned to Me", metrics['assigned_to_me'])
+        col3.metric("My Open Requests", metrics['my_open'])
+        col4.metric("Approved Today", metrics['approved_today'])
+        col5.metric("Submitted Today", metrics['created_today'])
+
+    def display_analytics(self, analytics):
+        summary = analytics.summary()
+        if not summary['decisions'] and not summary['open_pending']:
+            st.info("No approval activity yet.")
+            return
+        hours = lambda value: f"{value:.1f} h" if value is not None else "-"
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Median time in Pending", hours(summary['median_wait_hours']))
+        col2.metric("90th percentile", hours(summary['p90_wait_hours']))
+        col3.metric(f"Decided within {analytics.SLA_HOURS} h", f"{summary['within_sla']:.0%}" if summary['within_sla'] is not None else "-")
+        col4.metric("Waiting now", summary['open_pending'], f"{summary['open_over_sla']} over SLA", delta_color="inverse")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Oldest waiting", hours(summary['oldest_open_hours']))
+        col2.metric("Requests returned", summary['returned_requests'])
+        col3.metric("Resubmissions", summary['resubmissions'])
+        st.write("Turnaround per approver:")
+        st.dataframe(analytics.approver_turnaround())
+        return_loops = analytics.return_loops()
+        if not return_loops.empty:
+            st.write("Requests by number of return/resubmit loops:")
+            st.bar_chart(return_loops)
+
     def display_request_history(self, request_id, history_df):
         request_history = history_df[history_df['request_id'] == request_id].sort_values(by='timestamp', ascending=False)
         if not request_history.empty:
@@ -250,6 +2151,16 @@ class DisplayManager:
         else:
             st.info(f"No history found for Request ID: {request_id}")
 
+    def display_request_id_picker(self, lookup, key, limit=50, label="Select a Request ID to view history"):
+        prefix = st.text_input("Filter Request IDs", key=f"{key}_filter")
+        request_ids, total = lookup(prefix, limit)
+        if not request_ids:
+            st.info("No matching request IDs.")
+            return None
+        if total > len(request_ids):
+            st.caption(f"Showing {len(request_ids)} of {total} matching IDs. Type more of the ID to narrow the list.")
+        return st.selectbox(label, request_ids, key=key)
+
     def display_pending_registrations(self, df):
         if not df.empty:
             for index, reg in df.iterrows():
@@ -257,7 +2168,7 @@ class DisplayManager:
                 st.markdown(f"**Requested Role:** user")
                 col1, col2 = st.columns(2)
                 with col1:
-                    approve_role = st.selectbox("Approve As", ['user', 'approver', 'admin'], key=f"approve_role_{reg['username']}")
+                    approve_role = st.selectbox("Approve As", USER_ROLES, key=f"approve_role_{reg['username']}")
                     if st.button("Approve", key=f"approve_reg_{reg['username']}"):
                         return 'approve', reg['username'], approve_role
                 with col2:
@@ -275,7 +2186,7 @@ class DisplayManager:
             with col1:
                 st.write(f"**{user['username']}** (Current Role: {user['role']})")
             with col2:
-                new_role = st.selectbox("New Role", ['user', 'approver', 'admin'], key=f"role_select_{user['username']}", index=['user', 'approver', 'admin'].index(user['role']))
+                new_role = st.selectbox("New Role", USER_ROLES, key=f"role_select_{user['username']}", index=USER_ROLES.index(user['role']))
                 if st.button("Change Role", key=f"change_role_{user['username']}"):
                     return 'change_role', user['username'], new_role
         st.dataframe(df)
@@ -298,45 +2209,60 @@ class AdminPanel:
         st.subheader("Pending Registrations")
         pending_registrations = self.user_manager.get_pending_registrations()
         action, username, role = self.display_manager.display_pending_registrations(pending_registrations)
-        if action == 'approve' and username:
-            self.user_manager.approve_registration(username, role)
-            st.rerun()
-        elif action == 'reject' and username:
-            self.user_manager.reject_registration(username)
-            st.rerun()
+        try:
+            if action == 'approve' and username:
+                self.user_manager.approve_registration(username, role)
+                st.success(f"User '{username}' approved as '{role}'.")
+                st.rerun()
+            elif action == 'reject' and username:
+                self.user_manager.reject_registration(username)
+                st.info(f"Registration for '{username}' rejected.")
+                st.rerun()
+        except ApprovalError as error:
+            st.error(str(error))
 
         st.subheader("User Management")
-        all_users = self.user_manager.get_all_users()
-        user_action, edit_username, new_role = self.display_manager.display_all_users(all_users)
+        users_page = self.user_manager.page(self.display_manager.page_cursor("admin_users"), self.display_manager.PAGE_SIZE)
+        user_action, edit_username, new_role = self.display_manager.display_all_users(users_page)
         if user_action == 'change_role' and edit_username and new_role:
-            self.user_manager.change_user_role(edit_username, new_role)
-            st.rerun()
+            try:
+                self.user_manager.change_user_role(edit_username, new_role)
+                st.success(f"Role of '{edit_username}' changed to '{new_role}'.")
+                st.rerun()
+            except ApprovalError as error:
+                st.error(str(error))
+        self.display_manager.display_page_controls(users_page, 'username', "admin_users")
 
         st.subheader("All Requests")
-        all_requests = self.request_manager.data_manager.load_requests()
-        self.display_manager.display_requests(all_requests, "All Requests")
+        self.display_manager.display_request_page(self.request_manager.requests, "All Requests", "admin_all_requests")
 
         st.subheader("Delete Requests")
-        request_to_delete_id = st.number_input("Enter Request ID to Delete", min_value=1, step=1)
-        if st.button("Delete Request"):
-            request_to_delete = self.request_manager.data_manager.load_requests()
-            request_to_delete = request_to_delete[request_to_delete['id'] == request_to_delete_id]
-            if not request_to_delete.empty:
-                deleted_request = request_to_delete.iloc[0].to_dict()
-                deleted_request['deleted_by'] = st.session_state['logged_in_user']
-                deleted_request['deleted_at'] = pd.Timestamp('now')
-                deleted_requests_df = self.request_manager.data_manager.load_deleted_requests()
-                updated_deleted_requests = pd.concat([deleted_requests_df, pd.Series(deleted_request).to_frame().T], ignore_index=True)
-                self.request_manager.data_manager.save_deleted_requests(updated_deleted_requests)
-
-                updated_requests_df = self.request_manager.data_manager.load_requests()
-                updated_requests_df = updated_requests_df[updated_requests_df['id'] != request_to_delete_id]
-                self.request_manager.data_manager.save_requests(updated_requests_df)
-                self.request_manager.log_request_history(request_to_delete_id, 'Deleted', st.session_state['logged_in_user'], {'original_details': deleted_request})
-                st.success(f"Request ID {request_to_delete_id} deleted (still available for backtracking).")
+        request_to_delete_id = self.display_manager.display_request_id_picker(self.request_manager.lookup_request_ids, key="admin_delete_request_id", label="Request ID to delete")
+        if request_to_delete_id and st.button("Delete Request"):
+            try:
+                self.request_manager.delete_request(request_to_delete_id, st.session_state['logged_in_user'])
+                st.success(f"Request ID {request_to_delete_id} deleted (can be restored until deleted requests are compacted).")
                 st.rerun()
-            else:
-                st.error(f"Request ID {request_to_delete_id} not found.")
+            except ApprovalError as error:
+                st.error(str(error))
+
+        tombstoned_ids = self.request_manager.data_manager.load_tombstones()['request_id'].tolist()
+        if tombstoned_ids:
+            col1, col2 = st.columns(2)
+            with col1:
+                request_to_restore_id = st.selectbox("Request ID to restore", tombstoned_ids, key="admin_restore_request_id")
+                if st.button("Restore Request"):
+                    try:
+                        self.request_manager.restore_request(request_to_restore_id, st.session_state['logged_in_user'])
+                        st.success(f"Request ID {request_to_restore_id} restored.")
+                        st.rerun()
+                    except ApprovalError as error:
+                        st.error(str(error))
+            with col2:
+                st.write(f"{len(tombstoned_ids)} deleted request(s) awaiting compaction.")
+                if st.button("Compact Deleted Requests"):
+                    st.success(f"Moved {self.request_manager.compact_deleted_requests()} deleted request(s) to the archive.")
+                    st.rerun()
 
         self.display_manager.display_deleted_requests(self.request_manager.data_manager.load_deleted_requests())
 
@@ -344,15 +2270,20 @@ class AdminPanel:
         history_df = self.request_manager.data_manager.load_request_history()
         if not history_df.empty:
             st.subheader("View Request History")
-            request_ids = self.request_manager.data_manager.load_requests()['id'].unique().tolist()
-            request_id_to_view = st.selectbox("Select a Request ID to view history", request_ids)
-            self.display_manager.display_request_history(request_id_to_view, history_df)
+            request_id_to_view = self.display_manager.display_request_id_picker(self.request_manager.lookup_request_ids, key="admin_history_request_id")
+            if request_id_to_view:
+                self.display_manager.display_request_history(request_id_to_view, history_df)
         else:
             st.info("No request history available.")
 
+        st.subheader("Approval Analytics")
+        self.display_manager.display_analytics(self.request_manager.get_analytics())
+
 class ApprovalApp:
+    AUTO_REFRESH_SECONDS = 10
+
     def __init__(self):
-        self.data_manager = DataManager()
+        self.data_manager = DataManager(mmap_tables=MMAP_TABLES)
         self.user_manager = UserManager(self.data_manager)
         self.request_manager = RequestManager(self.data_manager)
         self.display_manager = DisplayManager()
@@ -362,46 +2293,87 @@ class ApprovalApp:
         st.title("Approval System")
 
         if 'logged_in_user' not in st.session_state:
-            if not self.user_manager.initialize_admin():
+            if not self.initialize_admin_ui():
                 self.login_ui()
         elif st.sidebar.button("Logout"):
-            self.user_manager.logout()
+            self.logout()
 
         if 'logged_in_user' in st.session_state:
             st.sidebar.write(f"Logged in as: {st.session_state['logged_in_user']} ({st.session_state['user_role']})")
             self.main_ui()
         else:
             if 'first_admin_initialized' not in st.session_state:
-                pass # Admin initialization is handled in UserManager
+                pass # Admin initialization is handled in initialize_admin_ui
             else:
                 self.register_ui()
 
+    def initialize_admin_ui(self):
+        if self.user_manager.has_users():
+            return False
+        st.subheader("Initialize First Admin User")
+        admin_username = st.text_input("Enter username for the first admin")
+        if st.button("Initialize Admin"):
+            try:
+                self.user_manager.initialize_admin(admin_username)
+            except ApprovalError as error:
+                st.error(str(error))
+            else:
+                st.success(f"Admin user '{admin_username}' created. Please log in.")
+                st.session_state['first_admin_initialized'] = True
+                st.rerun()
+        return True
+
     def register_ui(self):
         st.subheader("User Registration")
         new_username = st.text_input("New Username")
         if st.button("Register"):
-            self.user_manager.register_user(new_username)
+            try:
+                self.user_manager.register_user(new_username)
+                st.success("Registration submitted for admin approval as a regular user.")
+            except ApprovalError as error:
+                st.error(str(error))
 
     def login_ui(self):
         st.sidebar.subheader("Login")
         username = st.sidebar.text_input("Username")
         if st.sidebar.button("Login"):
-            self.user_manager.login(username)
+            try:
+                st.session_state['user_role'] = self.user_manager.login(username)
+                st.session_state['logged_in_user'] = username
+            except ApprovalError as error:
+                st.sidebar.error(str(error))
+
+    def logout(self):
+        st.session_state.pop('logged_in_user', None)
+        st.session_state.pop('user_role', None)
+        st.session_state.pop('editing_request_id', None)
+        st.session_state.pop('reviewing_request', None)
+        st.session_state.pop('first_admin_initialized', None)
+
+    def show_notice(self):
+        notice = st.session_state.pop('notice', None)
+        if notice:
+            getattr(st, notice[0])(notice[1])
 
     def main_ui(self):
+        self.show_notice()
+        self.display_manager.display_dashboard_metrics(self.request_manager.get_dashboard_metrics(st.session_state['logged_in_user']))
+
         if st.session_state['user_role'] in ['user', 'approver', 'admin']:
             st.subheader("Create New Request")
-            request_type = st.selectbox("Request Type", ['A', 'B', 'C', 'D', 'E', 'F'])
-            title = st.text_input("Request Title")
-            description = st.text_area("Description")
-            if st.button("Submit Request"):
-                self.request_manager.create_request(st.session_state['logged_in_user'], request_type, title, description)
-
-            user_requests = self.request_manager.get_user_requests(st.session_state['logged_in_user'])
-            self.display_manager.display_requests(user_requests, "Your Requests")
-
-            returned_requests = self.request_manager.get_returned_requests()
-            returned_requests = returned_requests[returned_requests['user'] == st.session_state['logged_in_user']]
+            with st.form("create_request_form", clear_on_submit=True):
+                request_type = st.selectbox("Request Type", REQUEST_TYPES)
+                title = st.text_input("Request Title")
+                description = st.text_area("Description")
+                priority = st.number_input("Priority (optional, higher is reviewed first)", value=None, step=1)
+                submitted = st.form_submit_button("Submit Request")
+            if submitted:
+                new_id = self.request_manager.create_request(st.session_state['logged_in_user'], request_type, title, description, priority)
+                st.success(f"Request submitted successfully with ID: {new_id}!")
+
+            self.display_manager.display_request_page(self.request_manager.where(user=st.session_state['logged_in_user']), "Your Requests", "user_requests")
+
+            returned_requests = self.request_manager.requests.where(status='Returned', user=st.session_state['logged_in_user']).to_frame()
             if not returned_requests.empty:
                 st.subheader("Returned Requests - Edit and Resubmit")
                 for index, req in returned_requests.iterrows():
@@ -409,65 +2381,131 @@ class ApprovalApp:
                         st.markdown(f"**Approver Comment:** {req['approver_comment']}")
                         st.markdown(f"**Type:** {req['request_type']}")
                         st.markdown(f"**Title:** {req['title']}")
-                        edit_description = st.text_area("Edit Description", value=req['description'], key=f"edit_description_{req['id']}")
-                        if st.button("Resubmit Request", key=f"resubmit_{req['id']}"):
-                            self.request_manager.update_request_status(req['id'], 'Pending', st.session_state['logged_in_user'], None)
-                            requests_df = self.data_manager.load_requests()
-                            requests_df.loc[requests_df['id'] == req['id'], 'description'] = edit_description
-                            self.data_manager.save_requests(requests_df)
-                            self.request_manager.log_request_history(req['id'], 'Edited', st.session_state['logged_in_user'], {'old_details': {'description': req['description']}, 'new_details': {'description': edit_description}})
-                            self.request_manager.log_request_history(req['id'], 'Resubmitted', st.session_state['logged_in_user'], {})
-                            st.success(f"Request ID {req['id']} resubmitted.")
-                            st.rerun()
+                        with st.form(f"resubmit_form_{req['id']}"):
+                            st.text_area("Edit Description", value=req['description'], key=f"edit_description_{req['id']}")
+                            st.form_submit_button("Resubmit Request", on_click=self.resubmit_clicked, args=(req['id'], req['version']))
+
+            st.subheader("Search Requests")
+            search_query = st.text_input("Search by title, description or comment", key="request_search")
+            if search_query:
+                self.display_manager.display_requests(self.request_manager.search_requests(search_query), "Search Results")
 
             st.subheader("View Request History")
-            requests_df = self.data_manager.load_requests()
-            request_ids = requests_df['id'].unique().tolist()
-            request_id_to_view = st.selectbox("Select a Request ID to view history", request_ids)
-            history_df = self.data_manager.load_request_history()
-            self.display_manager.display_request_history(request_id_to_view, history_df)
+            request_id_to_view = self.display_manager.display_request_id_picker(self.request_manager.lookup_request_ids, key="history_request_id")
+            if request_id_to_view:
+                history_df = self.data_manager.load_request_history()
+                self.display_manager.display_request_history(request_id_to_view, history_df)
 
         if st.session_state['user_role'] in ['approver', 'admin']:
-            st.subheader("Pending Approvals")
-            pending_requests = self.request_manager.get_pending_requests()
-            if not pending_requests.empty:
-                for index, req in pending_requests.iterrows():
-                    st.markdown(f"**Request ID:** {req['id']}")
-                    st.markdown(f"**User:** {req['user']}")
-                    st.markdown(f"**Type:** {req['request_type']}")
-                    st.markdown(f"**Title:** {req['title']}")
-                    st.markdown(f"**Description:** {req['description']}")
-
-                    col1, col2, col3 = st.columns(3)
-                    with col1:
-                        if st.button("Approve", key=f"approve_{req['id']}"):
-                            self.request_manager.update_request_status(req['id'], 'Approved', st.session_state['logged_in_user'])
-                            st.rerun()
-                    with col2:
-                        deny_comment = st.text_area("Deny Comment", key=f"deny_comment_{req['id']}")
-                        if st.button("Deny", key=f"deny_{req['id']}"):
-                            self.request_manager.update_request_status(req['id'], 'Denied', st.session_state['logged_in_user'], deny_comment)
-                            st.rerun()
-                    with col3:
-                        return_comment = st.text_area("Return Comment", key=f"return_comment_{req['id']}")
-                        if st.button("Return", key=f"return_{req['id']}"):
-                            self.request_manager.update_request_status(req['id'], 'Returned', st.session_state['logged_in_user'], return_comment)
-                            st.rerun()
-                    st.divider()
+            if st.sidebar.checkbox("Auto-refresh approvals", key="auto_refresh_approvals") and hasattr(st, 'fragment'):
+                st.fragment(run_every=self.AUTO_REFRESH_SECONDS)(self.pending_approvals_ui)()
             else:
-                st.info("No pending approvals.")
-
-            approved_requests = self.request_manager.get_approved_requests()
-            denied_requests = self.request_manager.get_denied_requests()
-            returned_requests = self.request_manager.get_returned_requests()
+                self.pending_approvals_ui()
 
-            self.display_manager.display_requests(approved_requests, "Approved Requests")
-            self.display_manager.display_requests(denied_requests, "Denied Requests")
-            self.display_manager.display_requests(returned_requests, "Returned Requests")
+            for status in ['Approved', 'Denied', 'Returned']:
+                self.display_manager.display_request_page(self.request_manager.where(status=status), f"{status} Requests", f"{status.lower()}_requests")
 
         if st.session_state['user_role'] == 'admin':
             self.admin_panel.show()
 
+    def pending_approvals_ui(self):
+        self.show_notice()
+        st.subheader("Pending Approvals")
+        user = st.session_state['logged_in_user']
+        claims = self.request_manager.active_claims()
+        review_queue = self.request_manager.get_review_queue(user)
+        if st.checkbox("Only requests assigned to me", key="assigned_only"):
+            review_queue = review_queue.where(assignee=user)
+        limit = st.session_state.setdefault('review_queue_limit', self.display_manager.PAGE_SIZE)
+        pending_requests = review_queue.top(limit)
+        if not pending_requests.empty:
+            pending_count = review_queue.count()
+            st.caption(f"Showing the {len(pending_requests)} most urgent of {pending_count} pending request(s).")
+            for index, req in pending_requests.iterrows():
+                st.markdown(f"**Request ID:** {req['id']}")
+                st.markdown(f"**User:** {req['user']}")
+                st.markdown(f"**Type:** {req['request_type']}")
+                st.markdown(f"**Title:** {req['title']}")
+                st.markdown(f"**Description:** {req['description']}")
+                stage = self.request_manager.workflow.stage(req)
+                if stage is not None:
+                    st.markdown(f"**Stage:** {stage.name}")
+                if pd.notna(req['assignee']):
+                    st.markdown(f"**Assigned to:** {req['assignee']}")
+                if req['id'] in claims:
+                    st.caption(f"Claimed by you until {claims[req['id']][1]:%H:%M}")
+
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.button("Approve", key=f"approve_{req['id']}", on_click=self.review_clicked, args=(req['id'], 'Approved', req['version']))
+                with col2:
+                    st.button("Deny", key=f"deny_{req['id']}", on_click=self.start_review, args=(req['id'], 'Denied', req['version']))
+                with col3:
+                    st.button("Return", key=f"return_{req['id']}", on_click=self.start_review, args=(req['id'], 'Returned', req['version']))
+                with col4:
+                    if req['id'] in claims:
+                        st.button("Release", key=f"release_{req['id']}", on_click=self.release_clicked, args=(req['id'],))
+                    else:
+                        st.button("Claim", key=f"claim_{req['id']}", on_click=self.claim_clicked, args=(req['id'],))
+                if st.session_state.get('reviewing_request', (None,))[0] == req['id']:
+                    self.review_comment_form(*st.session_state['reviewing_request'])
+                st.divider()
+            if len(pending_requests) < pending_count and st.button("Show more", key="review_queue_more"):
+                st.session_state['review_queue_limit'] = limit + self.display_manager.PAGE_SIZE
+                st.rerun()
+        else:
+            st.info("No pending approvals.")
+
+    def review_comment_form(self, request_id, new_status, expected_version):
+        action = 'Deny' if new_status == 'Denied' else 'Return'
+        with st.form(f"review_form_{request_id}"):
+            st.text_area(f"{action} Comment", key=f"review_comment_{request_id}")
+            col1, col2 = st.columns(2)
+            col1.form_submit_button(f"Confirm {action}", on_click=self.review_clicked, args=(request_id, new_status, expected_version, f"review_comment_{request_id}"))
+            col2.form_submit_button("Cancel", on_click=self.cancel_review)
+
+    def start_review(self, request_id, new_status, expected_version):
+        if self.run_action(lambda: self.request_manager.claim_request(request_id, st.session_state['logged_in_user']), None):
+            st.session_state['reviewing_request'] = (request_id, new_status, expected_version)
+
+    def claim_clicked(self, request_id):
+        self.run_action(lambda: self.request_manager.claim_request(request_id, st.session_state['logged_in_user']),
+                        f"Request {request_id} claimed for {RequestManager.LEASE_MINUTES} minutes.")
+
+    def release_clicked(self, request_id):
+        self.run_action(lambda: self.request_manager.release_claim(request_id, st.session_state['logged_in_user']), f"Request {request_id} released.")
+
+    def cancel_review(self):
+        st.session_state.pop('reviewing_request', None)
+
+    def review_clicked(self, request_id, new_status, expected_version, comment_key=None):
+        comment = st.session_state.get(comment_key) if comment_key else None
+        self.cancel_review()
+        self.run_action(lambda: self.request_manager.update_request_status(request_id, new_status, st.session_state['logged_in_user'], comment, expected_version),
+                        lambda request: f"Request {request_id} updated to {request['status']}." if request['status'] == new_status else f"Request {request_id} moved to the next approval stage.")
+
+    def resubmit_clicked(self, request_id, expected_version):
+        description = st.session_state.get(f"edit_description_{request_id}")
+        self.run_action(lambda: self.request_manager.resubmit_request(request_id, st.session_state['logged_in_user'], description, expected_version),
+                        f"Request ID {request_id} resubmitted.")
+
+    def run_action(self, action, success_message):
+        try:
+            result = action()
+        except VersionConflictError as error:
+            st.session_state['notice'] = ('warning', f"{error} The lists show its current state.")
+        except ApprovalError as error:
+            st.session_state['notice'] = ('error', str(error))
+        else:
+            if success_message:
+                st.session_state['notice'] = ('success', success_message(result) if callable(success_message) else success_message)
+            return True
+        return False
+
+@st.cache_resource
+def get_app():
+    return ApprovalApp()
+
 if __name__ == "__main__":
-    app = ApprovalApp()
+    app = get_app()
     app.run()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import signal
+import subprocess
+import sys
+
+NGINX_TEMPLATE = """upstream approval_workers {{
+    ip_hash;
+{servers}
+}}
+
+server {{
+    listen {listen_port};
+
+    location / {{
+        proxy_pass http://approval_workers;
+        proxy_http_version 1.1;
+        proxy_set_header Upgrade $http_upgrade;
+        proxy_set_header Connection "upgrade";
+        proxy_set_header Host $host;
+        proxy_read_timeout 86400;
+    }}
+}}
+"""
+
+def build_nginx_config(ports, listen_port):
+    servers = '\n'.join(f"    server 127.0.0.1:{port};" for port in ports)
+    return NGINX_TEMPLATE.format(servers=servers, listen_port=listen_port)
+
+def start_workers(app_path, data_dir, ports):
+    processes = []
+    for port in ports:
+        command = [sys.executable, '-m', 'streamlit', 'run', os.path.abspath(app_path),
+                   '--server.port', str(port), '--server.headless', 'true']
+        processes.append(subprocess.Popen(command, cwd=data_dir))
+    return processes
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several Streamlit workers over one shared data directory.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--base-port', type=int, default=8601)
+    parser.add_argument('--listen-port', type=int, default=8501)
+    parser.add_argument('--data-dir', default='.')
+    parser.add_argument('--app', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main10.py'))
+    parser.add_argument('--nginx-config', help="Write a reverse proxy config for the workers to this path.")
+    args = parser.parse_args()
+
+    ports = [args.base_port + i for i in range(args.workers)]
+    if args.nginx_config:
+        with open(args.nginx_config, 'w') as config_file:
+            config_file.write(build_nginx_config(ports, args.listen_port))
+        print(f"Wrote reverse proxy config to {args.nginx_config}")
+
+    processes = start_workers(args.app, os.path.abspath(args.data_dir), ports)
+    print(f"Started {len(processes)} workers on ports {ports[0]}-{ports[-1]}")
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.send_signal(signal.SIGINT)
+        for process in processes:
+            process.wait()
+
+if __name__ == "__main__":
+    main()